@@ -1,41 +1,92 @@
-from fastapi import HTTPException, Security, status, Depends
+from fastapi import HTTPException, Request, Security, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 import logging
-import httpx
+import hashlib
 import uuid
 
 from app.core.config import settings
-from app.database import get_db
+from app.core.jwks import JWKSKeyStore
+from app.database import get_db, bind_actor, read_session_factory, RECENT_WRITE_HEADER
 from app.models.user import User
+from app.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer(auto_error=False)
 
 SUPABASE_JWKS_URL = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+SUPABASE_ISSUER = f"https://{settings.SUPABASE_URL.replace('https://', '').split('/')[0]}/auth/v1"
+
+jwks_store = JWKSKeyStore(
+    SUPABASE_JWKS_URL,
+    default_ttl=settings.JWKS_CACHE_TTL_SECONDS,
+    max_ttl=settings.JWKS_MAX_TTL_SECONDS,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL_SECONDS,
+    timeout=settings.JWKS_FETCH_TIMEOUT_SECONDS,
+)
+
+
+# Verified token payloads keyed by SHA-256 of the raw token, kept until exp
+token_cache = LRUCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+
+
+# Column snapshots of resolved users; short TTL bounds cross-worker staleness
+user_cache = LRUCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    default_ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
 async def get_public_key(token: str):
-    """Get public key from Supabase JWKS endpoint"""
+    """Get public key for the token's kid from the cached Supabase JWKS"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(SUPABASE_JWKS_URL)
-            jwks = resp.json()
         headers = jwt.get_unverified_header(token)
         kid = headers["kid"]
+    except Exception as e:
+        logger.error(f"Failed to read token header: {e}")
+        raise HTTPException(status_code=401, detail="Invalid token header")
 
-        for key in jwks["keys"]:
-            if key["kid"] == kid:
-                return key
-
+    key = await jwks_store.get_key(kid)
+    if key is None:
         raise HTTPException(status_code=401, detail="Public key not found")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to fetch public key: {e}")
-        raise HTTPException(status_code=401, detail="Failed to fetch public key")
+    return key
+
+
+async def decode_supabase_token(token: str) -> dict:
+    """
+    Verify a Supabase access token and return its payload.
+    Shared by the REST and WebSocket paths so both use the same key store
+    and verified-token cache. Raises JWTError or HTTPException on failure.
+    """
+    # Reuse the payload if this exact token was already verified
+    cache_key = _token_cache_key(token)
+    cached_payload = token_cache.get(cache_key)
+    if cached_payload is not None:
+        return dict(cached_payload)
+    
+    # Get public key and decode JWT
+    public_key = await get_public_key(token)
+    payload = jwt.decode(
+        token,
+        public_key,
+        algorithms=["ES256"],
+        audience="authenticated",
+        issuer=SUPABASE_ISSUER
+    )
+    
+    # Tokens without exp are never cached
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(cache_key, dict(payload), expires_at=float(exp))
+    
+    return payload
 
 
 async def verify_jwt_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
@@ -53,17 +104,7 @@ async def verify_jwt_token(credentials: HTTPAuthorizationCredentials = Security(
         if token.startswith("Bearer "):
             token = token[7:]
         
-        # Get public key and decode JWT
-        public_key = await get_public_key(token)
-        payload = jwt.decode(
-            token,
-            public_key,
-            algorithms=["ES256"],
-            audience="authenticated",
-            issuer=f"https://{settings.SUPABASE_URL.replace('https://', '').split('/')[0]}/auth/v1"
-        )
-        
-        return payload
+        return await decode_supabase_token(token)
         
     except JWTError as e:
         logger.error(f"JWT verification failed: {e}")
@@ -81,20 +122,46 @@ async def verify_jwt_token(credentials: HTTPAuthorizationCredentials = Security(
         )
 
 
+def _user_snapshot(user: User) -> dict:
+    return {
+        "id": user.id,
+        "name": user.name,
+        "role": user.role,
+        "reward_points": user.reward_points,
+        "created_at": user.created_at,
+    }
+
+
+def invalidate_cached_user(user_id) -> None:
+    """Drop a user's cached snapshot after the row changes"""
+    if isinstance(user_id, str):
+        user_id = uuid.UUID(user_id)
+    user_cache.pop(user_id)
+
+
 async def get_current_user(
     payload: dict = Depends(verify_jwt_token),
     db: AsyncSession = Depends(get_db)
 ) -> User:
-    """Get current authenticated user from database"""
+    """Get current authenticated user from the identity cache or database"""
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token: missing user ID"
         )
+    user_uuid = uuid.UUID(user_id)
+    
+    # Attach the cached snapshot to this session without a SELECT
+    bind_actor(db, user_uuid)
+    snapshot = user_cache.get(user_uuid)
+    if snapshot is not None:
+        cached_user = User(**snapshot)
+        make_transient_to_detached(cached_user)
+        return await db.merge(cached_user, load=False)
     
     # Fetch user from database
-    result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
+    result = await db.execute(select(User).where(User.id == user_uuid))
     user = result.scalar_one_or_none()
     
     if not user:
@@ -103,73 +170,54 @@ async def get_current_user(
             detail="User not found"
         )
     
+    user_cache.set(user_uuid, _user_snapshot(user))
     return user
 
 
+async def get_read_db(
+    request: Request,
+    payload: dict = Depends(verify_jwt_token)
+) -> AsyncSession:
+    """
+    Dependency to get a read-only session on the replica.
+    Users who committed a write within READ_YOUR_WRITES_SECONDS stay on the
+    primary so they see their own changes, whichever worker served the write.
+    """
+    session_factory = read_session_factory(
+        payload.get("sub"),
+        recent_write=bool(request.headers.get(RECENT_WRITE_HEADER))
+    )
+    async with session_factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            raise e
+        finally:
+            await session.close()
+
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     return current_user
 
 
-def verify_token(token: str) -> dict:
-    """Synchronous token verification for WebSocket (no async context)"""
-    import httpx
-    from jose import jwt
-    
+async def verify_token(token: str) -> dict:
+    """Token verification for WebSocket connections (raises ValueError on failure)"""
     try:
-        # Get JWKS from Supabase
-        resp = httpx.get(SUPABASE_JWKS_URL, timeout=10.0)
-        if resp.status_code != 200:
-            logger.error(f"Failed to fetch JWKS: HTTP {resp.status_code}")
-            raise ValueError(f"Failed to fetch JWKS")
-        
-        jwks_data = resp.json()
-        
-        # Get unverified header to find the kid
-        try:
-            headers = jwt.get_unverified_header(token)
-            kid = headers.get("kid")
-        except Exception as header_error:
-            logger.error(f"Failed to get token header: {header_error}")
-            raise ValueError("Invalid token format")
-        
-        if not kid:
-            logger.error("Token header missing 'kid'")
-            raise ValueError("Token missing key ID")
-        
-        # Find matching key from JWKS
-        public_key = None
-        for key in jwks_data.get("keys", []):
-            if key.get("kid") == kid:
-                public_key = key
-                break
-        
-        if not public_key:
-            logger.error(f"Key ID {kid} not found in JWKS")
-            raise ValueError("Key not found")
-        
-        # Verify and decode token
-        issuer = f"https://{settings.SUPABASE_URL.replace('https://', '').split('/')[0]}/auth/v1"
-        try:
-            payload = jwt.decode(
-                token,
-                public_key,
-                algorithms=["RS256", "ES256"],
-                audience="authenticated",
-                issuer=issuer,
-                options={"verify_signature": True}
-            )
-            logger.info(f"Token verified successfully for user {payload.get('sub')}")
-            return payload
-        except JWTError as jwt_error:
-            logger.error(f"JWT verification failed: {jwt_error}")
-            raise ValueError("Invalid token")
-    
-    except ValueError:
-        raise
+        payload = await decode_supabase_token(token)
+    except HTTPException as e:
+        logger.error(f"WebSocket token rejected: {e.detail}")
+        raise ValueError(e.detail)
+    except JWTError as jwt_error:
+        logger.error(f"JWT verification failed: {jwt_error}")
+        raise ValueError("Invalid token")
     except Exception as e:
         logger.error(f"Token verification error: {type(e).__name__}: {e}")
         raise ValueError("Token verification failed")
+    
+    logger.info(f"Token verified successfully for user {payload.get('sub')}")
+    return payload
 
 
 # For REST endpoints that need current user
@@ -5,12 +5,83 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DATABASE_READ_URL: Optional[str] = None  # Read replica for read-only endpoints
+    # Keep a user on the primary after their own writes. Tracked per worker
+    # and echoed by the client in the X-Recent-Write header, so it also holds
+    # when the next request lands on a different worker
+    READ_YOUR_WRITES_SECONDS: int = 5
+
+    # Connection pool
+    # "pgbouncer": transaction pooling, prepared statements disabled
+    # "direct": dedicated Postgres, asyncpg prepared statement cache enabled
+    DB_POOL_MODE: str = "pgbouncer"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100  # direct mode only
+    DB_CONNECT_TIMEOUT: int = 120
+    DB_COMMAND_TIMEOUT: int = 120
+    # Retries for transactions aborted by deadlock / serialization failure
+    DB_RETRY_ATTEMPTS: int = 3
+    DB_RETRY_BASE_DELAY_MS: int = 50
     
     # Supabase Configuration
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: Optional[str] = None
     SUPABASE_SERVICE_KEY: Optional[str] = None
-    
+
+    # JWKS key cache
+    JWKS_CACHE_TTL_SECONDS: int = 600  # Used when the response carries no max-age
+    JWKS_MAX_TTL_SECONDS: int = 86400
+    JWKS_MIN_REFRESH_INTERVAL_SECONDS: int = 30  # Floor for refetches (unknown kid, failures)
+    JWKS_FETCH_TIMEOUT_SECONDS: float = 10.0
+
+    # Verified-token cache (0 disables)
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Current-user identity cache (TTL 0 disables)
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # Idempotency-Key replay window
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 300  # An in-progress key older than this is abandoned
+
+    # Chat
+    CHAT_HISTORY_PAGE_SIZE: int = 50
+    CHAT_MAX_MESSAGE_LENGTH: int = 1000  # Keeps fan-out events under the NOTIFY limit
+    # Cross-worker fan-out: "postgres" (LISTEN/NOTIFY) or "memory" (single process)
+    CHAT_BACKPLANE: str = "postgres"
+    CHAT_BACKPLANE_DSN: Optional[str] = None  # Defaults to DATABASE_URL; must not be a transaction pooler
+    # Message persistence: "sync" broadcasts once the row's batch is committed,
+    # "write_behind" broadcasts immediately and persists in the background
+    CHAT_PERSIST_MODE: str = "sync"
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    CHAT_WRITE_FLUSH_MS: int = 20
+    # Socket limits (also used by the notification stream)
+    CHAT_SEND_QUEUE_SIZE: int = 100  # Frames buffered per socket before it is evicted as too slow
+    CHAT_SEND_TIMEOUT_SECONDS: float = 10.0
+    CHAT_PING_INTERVAL_SECONDS: float = 25.0  # Server ping when a socket has been quiet this long
+    CHAT_IDLE_TIMEOUT_SECONDS: float = 75.0  # Close sockets that send nothing (not even pongs)
+    CHAT_MAX_CONNECTIONS_PER_USER: int = 10
+    CHAT_MAX_CONNECTIONS: int = 5000  # Per worker process
+
+    # Notification push stream
+    NOTIFICATION_MAX_CONNECTIONS_PER_USER: int = 10
+    NOTIFICATION_MAX_CONNECTIONS: int = 5000  # Per worker process
+    # Per-user unread counter cache (TTL 0 disables); kept current from push events
+    UNREAD_COUNT_CACHE_TTL_SECONDS: int = 60
+    UNREAD_COUNT_CACHE_MAX_SIZE: int = 10000
+    # Read notifications older than this move to notifications_archive (0 disables)
+    NOTIFICATION_RETENTION_DAYS: int = 30
+    NOTIFICATION_RETENTION_INTERVAL_SECONDS: int = 3600
+    NOTIFICATION_ARCHIVE_BATCH_SIZE: int = 1000
+    # Outbox worker: woken on local commits, polls for other workers' rows
+    NOTIFICATION_OUTBOX_POLL_SECONDS: float = 2.0
+    NOTIFICATION_OUTBOX_BATCH_SIZE: int = 100
+
     # Application
     APP_NAME: str = "Do4U Backend"
     DEBUG: bool = False
@@ -0,0 +1,127 @@
+from fastapi import Depends, Header, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Any, Awaitable, Callable, Optional
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import hashlib
+import json
+import logging
+
+from app.core.auth import get_current_active_user
+from app.database import AsyncSessionLocal, get_db
+from app.models.user import User
+from app.services.idempotency_service import (
+    IdempotencyService, clear_applied_marker, mark_applied_on_commit, was_applied
+)
+from app.utils.exceptions import ConflictError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+COMPLETE_ATTEMPTS = 3
+
+
+class IdempotencyGuard:
+    """
+    Runs a mutating operation at most once per (user, Idempotency-Key).
+    A retry with the same key and body gets the stored response back; the
+    same key with a different body is rejected. Without a key the operation
+    simply runs.
+    """
+
+    def __init__(self, key: Optional[str], user_id: UUID, scope: str, db: AsyncSession):
+        self.key = key
+        self.user_id = user_id
+        self.scope = scope
+        self.db = db  # The request session the operation commits on
+
+    def _request_hash(self, payload: Any) -> str:
+        body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{self.scope}\n{body}".encode("utf-8")).hexdigest()
+
+    async def run(
+        self,
+        operation: Callable[[], Awaitable[Any]],
+        payload: Any = None,
+        response_model: Any = None,
+        status_code: int = 200
+    ) -> Any:
+        if not self.key:
+            return await operation()
+
+        request_hash = self._request_hash(payload)
+        async with AsyncSessionLocal() as db:
+            existing = await IdempotencyService(db).reserve(self.user_id, self.key, request_hash)
+
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                raise ValidationError("Idempotency-Key was already used with a different request")
+            if existing.status == "applied":
+                # Ran, but its response was never stored; re-running could double-apply
+                raise ConflictError("The request with this Idempotency-Key was applied but its response is unavailable")
+            if existing.status != "completed":
+                raise ConflictError("A request with this Idempotency-Key is still in progress")
+            return JSONResponse(
+                status_code=existing.response_status,
+                content=existing.response_body,
+                headers={IDEMPOTENT_REPLAYED_HEADER: "true"}
+            )
+
+        # The key becomes "applied" in the same commit as the operation
+        mark_applied_on_commit(self.db, self.user_id, self.key)
+        try:
+            result = await operation()
+        except Exception:
+            if not was_applied(self.db):
+                # Nothing committed; let the client retry with the same key
+                await self._release()
+            raise
+        finally:
+            clear_applied_marker(self.db)
+
+        body = jsonable_encoder(
+            response_model.model_validate(result, from_attributes=True)
+            if response_model is not None else result
+        )
+        await self._complete(status_code, body)
+        return result
+
+    async def _release(self) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await IdempotencyService(db).release(self.user_id, self.key)
+        except Exception as e:
+            # Left in_progress; reclaimed after IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+            logger.error(f"Failed to release idempotency key for user {self.user_id}: {e}")
+
+    async def _complete(self, status_code: int, body: Any) -> None:
+        for attempt in range(1, COMPLETE_ATTEMPTS + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await IdempotencyService(db).complete(self.user_id, self.key, status_code, body)
+                return
+            except Exception as e:
+                if attempt == COMPLETE_ATTEMPTS:
+                    # The key stays "applied": retries get a 409, never a second run
+                    logger.error(f"Failed to store idempotent response for user {self.user_id}: {e}")
+                    return
+                await asyncio.sleep(0.05 * 2 ** (attempt - 1))
+
+
+async def idempotency_guard(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> IdempotencyGuard:
+    """Dependency reading the optional Idempotency-Key header"""
+    if idempotency_key is not None:
+        idempotency_key = idempotency_key.strip()
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            raise ValidationError(f"{IDEMPOTENCY_KEY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+    scope = f"{request.method} {request.url.path}"
+    return IdempotencyGuard(idempotency_key, current_user.id, scope, db)
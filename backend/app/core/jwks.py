@@ -0,0 +1,130 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+import re
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class JWKSKeyStore:
+    """
+    In-process cache of the signing keys published at a JWKS endpoint.
+
+    Keys are loaded once at startup and refreshed in the background before
+    they expire (TTL taken from Cache-Control max-age when present). A token
+    signed with an unknown kid triggers at most one refetch per
+    ``min_refresh_interval``. If a refresh fails the previously loaded keys
+    keep being served until a later refresh succeeds.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        default_ttl: int = 600,
+        max_ttl: int = 86400,
+        min_refresh_interval: int = 30,
+        timeout: float = 10.0,
+    ):
+        self.jwks_url = jwks_url
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._last_attempt = float("-inf")
+        self._lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Load keys and start the background refresh loop"""
+        await self.refresh()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh loop and close the HTTP client"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_key(self, kid: str) -> Optional[dict]:
+        """Return the JWK for ``kid``, refetching only when allowed"""
+        if not self._keys or time.monotonic() >= self._expires_at:
+            await self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None and self._can_refetch():
+            logger.info(f"JWKS: unknown kid {kid}, refetching keys")
+            await self.refresh(force=True)
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Fetch the JWKS document. Returns True when keys were updated."""
+        async with self._lock:
+            # Another waiter may have refreshed while we were queued on the lock
+            now = time.monotonic()
+            if self._keys and now < self._expires_at and not force:
+                return True
+            if now - self._last_attempt < self.min_refresh_interval:
+                return False
+            self._last_attempt = now
+
+            try:
+                resp = await self._get_client().get(self.jwks_url)
+                resp.raise_for_status()
+                keys = {key["kid"]: key for key in resp.json().get("keys", []) if key.get("kid")}
+            except Exception as e:
+                # Keep serving the stale keys; retry after the minimum interval
+                logger.error(f"Failed to refresh JWKS from {self.jwks_url}: {e}")
+                self._expires_at = now + self.min_refresh_interval
+                return False
+
+            self._keys = keys
+            self._expires_at = now + self._ttl_from_headers(resp.headers)
+            logger.info(f"JWKS refreshed: {len(keys)} key(s) loaded")
+            return True
+
+    def _can_refetch(self) -> bool:
+        return time.monotonic() - self._last_attempt >= self.min_refresh_interval
+
+    def _ttl_from_headers(self, headers: httpx.Headers) -> float:
+        cache_control = headers.get("cache-control", "")
+        match = _MAX_AGE_RE.search(cache_control)
+        if match:
+            ttl = int(match.group(1))
+        elif "no-cache" in cache_control.lower() or "no-store" in cache_control.lower():
+            ttl = self.min_refresh_interval
+        else:
+            ttl = self.default_ttl
+        return float(max(self.min_refresh_interval, min(ttl, self.max_ttl)))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Refresh a little ahead of expiry so requests never wait on it
+            delay = max(self._expires_at - time.monotonic() - 5, self.min_refresh_interval)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh(force=True)
+            except Exception as e:
+                logger.error(f"JWKS background refresh error: {e}")
@@ -1,30 +1,74 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import text
+from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy import text, exc, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from contextvars import ContextVar
+from typing import Optional
 import logging
+import time
+import uuid
 
 from app.core.config import settings
+from app.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
-db_url = settings.DATABASE_URL
-# Safety: if someone set 6543 explicitly, revert to 5432
-if "pooler.supabase.com:6543" in db_url:
-    db_url = db_url.replace("pooler.supabase.com:6543", "pooler.supabase.com:5432")
-
-engine = create_async_engine(
-    db_url,
-    echo=settings.DEBUG,
-    future=True,
-    pool_pre_ping=False,  # DISABLED: was causing timeouts on pool initialization
-    pool_size=2,  # Further reduced for Render's constraints
-    max_overflow=2,  # Minimal overflow
-    pool_timeout=120,  # Increased to 120 seconds
-    pool_recycle=300,
-    connect_args={
-        "timeout": 120,  # 120 seconds for connection establishment
-        "statement_cache_size": 0,  # Disable prepared statements to avoid PgBouncer issues
-        "command_timeout": 120,  # Extended command timeout
+
+class PoolMetrics:
+    """Counters for time spent waiting on pool checkouts"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+# Keyed by the pool's logging name ("primary" / "replica")
+pool_metrics = {"primary": PoolMetrics(), "replica": PoolMetrics()}
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        metrics = pool_metrics[self.logging_name or "primary"]
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def _engine_url_and_connect_args(raw_url: str):
+    """Build the engine URL and asyncpg connect args for DB_POOL_MODE"""
+    url = make_url(raw_url)
+    connect_args = {
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
         "server_settings": {
             "application_name": "do4u-backend",
             "jit": "off",
@@ -33,16 +77,146 @@ engine = create_async_engine(
             "tcp_keepalives_count": "5"
         },
         "ssl": "prefer"  # Use SSL but don't fail if unavailable
-    },
-)
+    }
+
+    # Port 6543 is Supabase's transaction pooler, 5432 its session port
+    supabase_pooler = bool(url.host and "pooler.supabase.com" in url.host)
+    if settings.DB_POOL_MODE == "direct":
+        # The transaction pooler cannot keep prepared statements; use the
+        # session port instead
+        if supabase_pooler and url.port == 6543:
+            logger.warning(f"{url.host}:6543 is the transaction pooler; using port 5432 for DB_POOL_MODE=direct")
+            url = url.set(port=5432)
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    else:
+        if supabase_pooler and url.port == 6543:
+            logger.warning(
+                f"Connecting through the transaction pooler at {url.host}:6543; "
+                "use port 5432 with DB_POOL_MODE=direct for session-level connections"
+            )
+        elif supabase_pooler and url.port == 5432:
+            logger.warning(
+                f"{url.host}:5432 is the session port but DB_POOL_MODE=pgbouncer "
+                "disables prepared statements; set DB_POOL_MODE=direct"
+            )
+        # Transaction pooling: no prepared statement reuse across transactions,
+        # and unique statement names so server connections never collide
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+
+    return url, connect_args
+
+
+def _create_engine(raw_url: str, pool_name: str):
+    url, connect_args = _engine_url_and_connect_args(raw_url)
+    return create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        future=True,
+        poolclass=InstrumentedAsyncPool,
+        pool_logging_name=pool_name,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL, "primary")
+
+# Optional read replica; falls back to the primary when not configured
+if settings.DATABASE_READ_URL:
+    read_engine = _create_engine(settings.DATABASE_READ_URL, "replica")
+else:
+    read_engine = engine
+
+
+class PrimarySession(Session):
+    """Sync session behind AsyncSessionLocal; records writes for read-your-writes"""
+
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
+    sync_session_class=PrimarySession,
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
 )
 
+# Users whose recent commits may not have reached the replica yet. This is
+# per worker process; RECENT_WRITE_HEADER carries the same fact through the
+# client so requests landing on another worker also stay on the primary.
+_recent_writers = LRUCache(max_size=10000, default_ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+# Response header set when a request committed writes (value: seconds to keep
+# reading from the primary); clients echo it back while that window is open
+RECENT_WRITE_HEADER = "X-Recent-Write"
+
+# Per-request marker flipped by commits that wrote; see track_request_writes
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+def track_request_writes() -> dict:
+    """Start recording whether the current request commits any writes"""
+    marker = {"wrote": False}
+    _request_writes.set(marker)
+    return marker
+
+
+def bind_actor(session: AsyncSession, user_id) -> None:
+    """Attribute writes committed on this session to ``user_id``"""
+    session.info["actor_id"] = str(user_id)
+
+
+@event.listens_for(PrimarySession, "after_flush")
+def _flag_write(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_writer(session):
+    if not session.info.pop("has_writes", False):
+        return
+    if session.info.get("actor_id"):
+        _recent_writers.set(session.info["actor_id"], True)
+    marker = _request_writes.get()
+    if marker is not None:
+        marker["wrote"] = True
+
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _forget_write(session):
+    session.info.pop("has_writes", None)
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """True if ``session`` reads from the replica rather than the primary"""
+    return read_engine is not engine and session.bind is read_engine
+
+
+def read_session_factory(user_id=None, recent_write: bool = False) -> async_sessionmaker:
+    """
+    Pick the replica, or the primary if ``user_id`` wrote within the lag
+    window on this worker or the client says it did (``recent_write``)
+    """
+    if read_engine is engine:
+        return AsyncSessionLocal
+    if recent_write:
+        return AsyncSessionLocal
+    if user_id is not None and _recent_writers.get(str(user_id)):
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal
+
+
 # Create base class for models
 Base = declarative_base()
 
@@ -65,6 +239,8 @@ async def init_db():
         # Test database connection
         async with engine.begin() as conn:
             await conn.execute(text("SELECT 1"))
+            # Workers starting together run the bootstrap one at a time
+            await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('do4u.init_db'))"))
             await conn.execute(text("ALTER TABLE IF EXISTS genies ADD COLUMN IF NOT EXISTS skill_proofs JSONB"))
             await conn.execute(text("ALTER TABLE IF EXISTS genies ADD COLUMN IF NOT EXISTS document_path VARCHAR"))
             await conn.execute(text("ALTER TABLE IF EXISTS genies ADD COLUMN IF NOT EXISTS verification_status VARCHAR"))
@@ -105,6 +281,106 @@ async def init_db():
                 CREATE UNIQUE INDEX IF NOT EXISTS uq_genie_locations_job_id
                 ON genie_locations(job_id)
             """))
+            # Keyset pagination: listings order by (created_at DESC, id DESC)
+            await conn.execute(text("ALTER TABLE IF EXISTS complaints ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_created_at_id ON jobs (created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at_id ON jobs (status, created_at DESC, id DESC)"))
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_jobs_available_feed
+                ON jobs (created_at DESC, id DESC)
+                WHERE status = 'POSTED' AND assigned_genie IS NULL
+            """))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_user_status_created_at ON jobs (user_id, status, created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_genie_status_created_at ON jobs (assigned_genie, status, created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON users (created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_role_created_at_id ON users (role, created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_complaints_created_at_id ON complaints (created_at DESC, id DESC)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_job_created_at_id ON messages (job_id, created_at, id)"))
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notifications_user_unread
+                ON notifications (user_id, created_at DESC)
+                WHERE is_read = false
+            """))
+            # Cold storage for read notifications past the retention window
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS notifications_archive (
+                    id UUID PRIMARY KEY,
+                    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    title VARCHAR NOT NULL,
+                    message VARCHAR NOT NULL,
+                    is_read BOOLEAN NOT NULL DEFAULT TRUE,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+                )
+            """))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_archive_user_created_at ON notifications_archive (user_id, created_at DESC)"))
+            # Retention job scans read rows by age
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_read_created_at ON notifications (created_at) WHERE is_read = true"))
+            # Transactional outbox drained into notifications by a background worker
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS notification_outbox (
+                    id BIGSERIAL PRIMARY KEY,
+                    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    title VARCHAR NOT NULL,
+                    message VARCHAR NOT NULL,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+                )
+            """))
+            # Wallet ledger: one row per balance movement
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS wallet_transactions (
+                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    kind VARCHAR NOT NULL,
+                    balance_delta NUMERIC(10, 2) NOT NULL DEFAULT 0,
+                    escrow_delta NUMERIC(10, 2) NOT NULL DEFAULT 0,
+                    balance_after NUMERIC(10, 2) NOT NULL,
+                    escrow_after NUMERIC(10, 2) NOT NULL,
+                    job_id UUID REFERENCES jobs(id) ON DELETE SET NULL,
+                    description VARCHAR,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp()
+                )
+            """))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_wallet_transactions_user_created_at_id ON wallet_transactions (user_id, created_at DESC, id DESC)"))
+            # Stored responses for Idempotency-Key replays
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    key VARCHAR(255) NOT NULL,
+                    request_hash VARCHAR(64) NOT NULL,
+                    status VARCHAR NOT NULL DEFAULT 'in_progress',
+                    response_status INTEGER,
+                    response_body JSONB,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                    PRIMARY KEY (user_id, key)
+                )
+            """))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at)"))
+            # Drop opening entries duplicated by earlier concurrent startups so
+            # the one-per-wallet index below can be built
+            await conn.execute(text("""
+                DELETE FROM wallet_transactions t
+                USING wallet_transactions keep
+                WHERE t.kind = 'OPENING_BALANCE'
+                  AND keep.kind = 'OPENING_BALANCE'
+                  AND keep.user_id = t.user_id
+                  AND (keep.created_at, keep.id) < (t.created_at, t.id)
+            """))
+            await conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_wallet_transactions_opening_balance ON wallet_transactions (user_id) WHERE kind = 'OPENING_BALANCE'"))
+            # Seed an opening entry for funded wallets that predate the ledger
+            await conn.execute(text("""
+                INSERT INTO wallet_transactions
+                    (user_id, kind, balance_delta, escrow_delta, balance_after, escrow_after, description)
+                SELECT w.user_id, 'OPENING_BALANCE',
+                       COALESCE(w.balance, 0), COALESCE(w.escrow_balance, 0),
+                       COALESCE(w.balance, 0), COALESCE(w.escrow_balance, 0),
+                       'Balance before ledger'
+                FROM wallet w
+                WHERE (COALESCE(w.balance, 0) <> 0 OR COALESCE(w.escrow_balance, 0) <> 0)
+                  AND NOT EXISTS (SELECT 1 FROM wallet_transactions t WHERE t.user_id = w.user_id)
+                ON CONFLICT (user_id) WHERE kind = 'OPENING_BALANCE' DO NOTHING
+            """))
         logger.info("Database connection established successfully")
     except Exception as e:
         logger.warning(f"Database connection failed: {e}")
@@ -114,3 +390,5 @@ async def init_db():
 async def close_db():
     """Close database connection"""
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -8,16 +8,45 @@ import logging
 from pathlib import Path
 import asyncio
 
-from app.database import init_db
+from app.database import (
+    init_db, close_db, engine, read_engine, pool_metrics,
+    track_request_writes, RECENT_WRITE_HEADER
+)
+from app.core.auth import jwks_store, token_cache, user_cache
+from app.core.config import settings
+from app.core.roles import require_admin
+from app.models.user import User
+from app.services.backplane import backplane
+from app.services.chat_service import chat_writer
+from app.services.notification_hub import notification_hub
+from app.services.notification_service import unread_counts
+from app.services.notification_retention import notification_retention
+from app.services.notification_outbox import notification_outbox
 from app.routes import jobs, offers, wallet, admin, users, notifications, chat, location
 from app.utils.exceptions import BaseAPIException
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.core.idempotency import IDEMPOTENT_REPLAYED_HEADER
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize database
     await init_db()
+    # Warm the JWKS cache so the first authenticated request skips the fetch
+    await jwks_store.start()
+    # Cross-worker fan-out for chat events
+    await backplane.start()
+    await chat_writer.start()
+    await notification_retention.start()
+    await notification_outbox.start()
     yield
+    await notification_outbox.stop()
+    await notification_retention.stop()
+    # Flush buffered chat messages before the pool goes away
+    await chat_writer.stop()
+    await backplane.stop()
+    await jwks_store.stop()
+    await close_db()
 
 
 ALLOWED_ORIGINS = [
@@ -45,9 +74,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, IDEMPOTENT_REPLAYED_HEADER, RECENT_WRITE_HEADER],
 )
 
 
+@app.middleware("http")
+async def mark_recent_writes(request: Request, call_next):
+    """Tell the client to read from the primary for a while after it wrote"""
+    writes = track_request_writes()
+    response = await call_next(request)
+    if writes["wrote"] and read_engine is not engine:
+        response.headers[RECENT_WRITE_HEADER] = str(settings.READ_YOUR_WRITES_SECONDS)
+    return response
+
+
 def _cors_headers(request: Request) -> dict:
     """
     Return CORS headers for error responses.
@@ -181,3 +221,19 @@ async def health_check():
             "error": str(e)
         }
 
+
+@app.get("/metrics")
+async def metrics(current_user: User = Depends(require_admin)):
+    """Process-local pool, cache and socket counters for monitoring (admins only)"""
+    db_pools = {"primary": pool_metrics["primary"].snapshot(engine.pool)}
+    if read_engine is not engine:
+        db_pools["replica"] = pool_metrics["replica"].snapshot(read_engine.pool)
+    return {
+        "db_pool_mode": settings.DB_POOL_MODE,
+        "db_pools": db_pools,
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "unread_count_cache": unread_counts.stats(),
+        "chat": chat.manager.stats(),
+        "notification_streams": notification_hub.stats(),
+    }
@@ -2,11 +2,12 @@ from app.models.user import User
 from app.models.genie import Genie
 from app.models.job import Job, JobStatus
 from app.models.offer import Offer
-from app.models.wallet import Wallet
+from app.models.wallet import Wallet, WalletTransaction, WalletTransactionKind
 from app.models.rating import Rating
 from app.models.complaint import Complaint, ComplaintStatus
-from app.models.notification import Notification
+from app.models.notification import Notification, NotificationArchive, NotificationOutbox
 from app.models.message import Message
+from app.models.idempotency import IdempotencyKey
 
 __all__ = [
     "User",
@@ -15,9 +16,14 @@ __all__ = [
     "JobStatus",
     "Offer",
     "Wallet",
+    "WalletTransaction",
+    "WalletTransactionKind",
     "Rating",
     "Complaint",
     "ComplaintStatus",
     "Notification",
-    "Message"
+    "NotificationArchive",
+    "NotificationOutbox",
+    "Message",
+    "IdempotencyKey"
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, UUID, ForeignKey
+from sqlalchemy import Column, String, DateTime, UUID, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 import enum
 
@@ -18,7 +18,14 @@ class Complaint(Base):
     complainant_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     reason = Column(String, nullable=False)
     status = Column(String, default="OPEN", nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=text("now()"))
     
     # Relationships
     job = relationship("Job", back_populates="complaints")
     complainant = relationship("User", back_populates="complaints_filed")
+    
+    # Keyset pagination index for the admin complaint listing
+    __table_args__ = (
+        Index("ix_complaints_created_at_id", created_at.desc(), id.desc()),
+    )
+
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, Integer, UUID, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a request sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # in_progress -> applied (committed with the operation) -> completed (response stored)
+    status = Column(String, nullable=False, default="in_progress")
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=text("now()"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", expires_at),
+    )
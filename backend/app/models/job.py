@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, text, Numeric, UUID, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, text, Numeric, UUID, ForeignKey, Integer, Index
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 import enum
@@ -46,4 +46,19 @@ class Job(Base):
     genie = relationship("User", foreign_keys=[assigned_genie], back_populates="assigned_jobs")
     offers = relationship("Offer", back_populates="job", cascade="all, delete-orphan")
     ratings = relationship("Rating", back_populates="job", cascade="all, delete-orphan")
-    complaints = relationship("Complaint", back_populates="job", cascade="all, delete-orphan")
\ No newline at end of file
+    complaints = relationship("Complaint", back_populates="job", cascade="all, delete-orphan")
+    
+    # Keyset pagination indexes (ORDER BY created_at DESC, id DESC)
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_jobs_status_created_at_id", status, created_at.desc(), id.desc()),
+        Index(
+            "ix_jobs_available_feed",
+            created_at.desc(),
+            id.desc(),
+            postgresql_where=text("status = 'POSTED' AND assigned_genie IS NULL"),
+        ),
+        # /jobs/my-jobs for posters and genies
+        Index("ix_jobs_user_status_created_at", user_id, status, created_at.desc(), id.desc()),
+        Index("ix_jobs_genie_status_created_at", assigned_genie, status, created_at.desc(), id.desc()),
+    )
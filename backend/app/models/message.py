@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, text, UUID, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, text, UUID, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -17,3 +17,9 @@ class Message(Base):
     # Relationships
     job = relationship("Job", backref="messages")
     sender = relationship("User", backref="sent_messages")
+    
+    # Cursor-paged history per job
+    __table_args__ = (
+        Index("ix_messages_job_created_at_id", job_id, created_at, id),
+    )
+
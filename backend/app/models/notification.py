@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, text, Boolean, UUID, ForeignKey
+from sqlalchemy import Column, String, DateTime, text, Boolean, UUID, ForeignKey, Index, BigInteger
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -17,3 +17,53 @@ class Notification(Base):
     
     # Relationships
     user = relationship("User", back_populates="notifications")
+    
+    # Fetch id/created_at on INSERT so new rows can be pushed without a reload
+    __mapper_args__ = {"eager_defaults": True}
+    
+    # Unread count and unread list only ever touch this small slice
+    __table_args__ = (
+        Index(
+            "ix_notifications_user_unread",
+            user_id,
+            created_at.desc(),
+            postgresql_where=text("is_read = false"),
+        ),
+        # Retention job scans read rows by age
+        Index(
+            "ix_notifications_read_created_at",
+            created_at,
+            postgresql_where=text("is_read = true"),
+        ),
+    )
+
+
+class NotificationArchive(Base):
+    """Read notifications moved out of the hot table by the retention job"""
+    __tablename__ = "notifications_archive"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    is_read = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=text("now()"), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_notifications_archive_user_created_at", user_id, created_at.desc()),
+    )
+
+
+class NotificationOutbox(Base):
+    """
+    Notifications waiting to be created. Written in the same transaction as
+    the business change and drained by the outbox worker.
+    """
+    __tablename__ = "notification_outbox"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=text("now()"), nullable=False)
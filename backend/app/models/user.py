@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, text, Integer
+from sqlalchemy import Column, String, DateTime, text, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -25,3 +25,9 @@ class User(Base):
     received_ratings = relationship("Rating", foreign_keys="Rating.reviewee_id", back_populates="reviewee")
     complaints_filed = relationship("Complaint", foreign_keys="Complaint.complainant_id", back_populates="complainant")
     notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
+    
+    # Keyset pagination indexes for the admin user listing
+    __table_args__ = (
+        Index("ix_users_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_users_role_created_at_id", role, created_at.desc(), id.desc()),
+    )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Numeric, UUID, ForeignKey
+from sqlalchemy import Column, Numeric, UUID, ForeignKey, String, DateTime, Index, text
 from sqlalchemy.orm import relationship
+import enum
 
 from app.database import Base
 
@@ -13,3 +14,45 @@ class Wallet(Base):
     
     # Relationships
     user = relationship("User", back_populates="wallet")
+
+
+class WalletTransactionKind(str, enum.Enum):
+    OPENING_BALANCE = "OPENING_BALANCE"  # Backfilled balance from before the ledger existed
+    DEPOSIT = "DEPOSIT"
+    WITHDRAWAL = "WITHDRAWAL"
+    ESCROW_HOLD = "ESCROW_HOLD"
+    ESCROW_RELEASE = "ESCROW_RELEASE"
+    PAYOUT_SENT = "PAYOUT_SENT"
+    PAYOUT_RECEIVED = "PAYOUT_RECEIVED"
+
+
+class WalletTransaction(Base):
+    """
+    Append-only ledger of wallet movements. Written in the same transaction
+    as the balance change, so summing the deltas reproduces the wallet.
+    """
+    __tablename__ = "wallet_transactions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    balance_delta = Column(Numeric(10, 2), nullable=False, default=0)
+    escrow_delta = Column(Numeric(10, 2), nullable=False, default=0)
+    balance_after = Column(Numeric(10, 2), nullable=False)
+    escrow_after = Column(Numeric(10, 2), nullable=False)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True)
+    description = Column(String, nullable=True)
+    # clock_timestamp keeps several entries from one transaction in order
+    created_at = Column(DateTime(timezone=True), server_default=text("clock_timestamp()"), nullable=False)
+    
+    # Statement history: ORDER BY created_at DESC, id DESC per user
+    __table_args__ = (
+        Index("ix_wallet_transactions_user_created_at_id", user_id, created_at.desc(), id.desc()),
+        # At most one opening entry per wallet
+        Index(
+            "uq_wallet_transactions_opening_balance",
+            user_id,
+            unique=True,
+            postgresql_where=text("kind = 'OPENING_BALANCE'"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
@@ -6,7 +6,7 @@ from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_user, get_read_db, invalidate_cached_user
 from app.core.roles import require_admin
 from app.models.user import User
 from app.models.job import Job, JobStatus
@@ -15,10 +15,12 @@ from app.models.wallet import Wallet
 from app.models.rating import Rating
 from app.models.complaint import Complaint, ComplaintStatus
 from app.models.genie import Genie
-from app.models.notification import Notification
+from app.services.notification_service import NotificationService
 from app.schemas.user import UserResponse, UserProfile
 from app.schemas.job import JobResponse
 from app.schemas.complaint import ComplaintResponse
+from app.services.job_service import JobService
+from app.utils.pagination import after_cursor, split_page, set_next_cursor
 
 router = APIRouter()
 
@@ -26,7 +28,7 @@ router = APIRouter()
 @router.get("/verifications/pending")
 async def get_pending_genie_verifications(
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all pending verification requests for GENIE users (admin only)."""
     query = (
@@ -85,13 +87,10 @@ async def approve_genie_verification(
     genie.verification_status = "APPROVED"
     genie.is_verified = True
 
-    db.add(
-        Notification(
-            user_id=user.id,
-            title="Verification Approved",
-            message="Your verification has been approved. You are now a verified Genie.",
-            is_read=False,
-        )
+    NotificationService(db).enqueue_notification(
+        user_id=user.id,
+        title="Verification Approved",
+        message="Your verification has been approved. You are now a verified Genie.",
     )
 
     await db.commit()
@@ -134,13 +133,10 @@ async def reject_genie_verification(
     genie.verification_status = "REJECTED"
     genie.is_verified = False
 
-    db.add(
-        Notification(
-            user_id=user.id,
-            title="Verification Rejected",
-            message="Your verification request has been rejected.",
-            is_read=False,
-        )
+    NotificationService(db).enqueue_notification(
+        user_id=user.id,
+        title="Verification Rejected",
+        message="Your verification request has been rejected.",
     )
 
     await db.commit()
@@ -156,7 +152,7 @@ async def reject_genie_verification(
 @router.get("/dashboard")
 async def get_admin_dashboard(
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get admin dashboard statistics"""
     
@@ -226,22 +222,29 @@ async def get_admin_dashboard(
 
 @router.get("/users")
 async def get_all_users(
+    response: Response,
     role: Optional[str] = Query(None),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all users (admin only)"""
-    query = select(User).order_by(User.created_at.desc())
+    query = select(User).order_by(User.created_at.desc(), User.id.desc())
     
     if role:
         query = query.where(User.role == role)
     
-    query = query.limit(limit).offset(offset)
+    keyset = after_cursor(User.created_at, User.id, cursor)
+    if keyset is not None:
+        query = query.where(keyset)
+    elif offset:
+        query = query.offset(offset)
     
-    result = await db.execute(query)
-    users = result.scalars().all()
+    result = await db.execute(query.limit(limit + 1))
+    users, next_cursor = split_page(result.scalars().all(), limit)
+    set_next_cursor(response, next_cursor)
 
     sanitized_users = []
     for user in users:
@@ -268,7 +271,7 @@ async def get_all_users(
 async def get_user_details(
     user_id: UUID,
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get detailed user information (admin only)"""
     result = await db.execute(
@@ -315,57 +318,59 @@ async def update_user_role(
     
     user.role = new_role
     await db.commit()
+    invalidate_cached_user(user.id)
     
     return {"message": f"User role updated to {new_role}"}
 
 
 @router.get("/jobs", response_model=List[JobResponse])
 async def get_all_jobs(
+    response: Response,
     status: Optional[JobStatus] = Query(None),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all jobs (admin only)"""
-    query = select(Job).options(
-        selectinload(Job.user),
-        selectinload(Job.genie),
-        selectinload(Job.offers)
-    ).order_by(Job.created_at.desc())
-    
-    if status:
-        query = query.where(Job.status == status)
-    
-    query = query.limit(limit).offset(offset)
-    
-    result = await db.execute(query)
-    jobs = result.scalars().all()
+    job_service = JobService(db)
+    jobs, next_cursor = await job_service.get_all_jobs(
+        status=status, limit=limit, offset=offset, cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
     
     return jobs
 
 
 @router.get("/complaints", response_model=List[ComplaintResponse])
 async def get_all_complaints(
+    response: Response,
     status: Optional[ComplaintStatus] = Query(None),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all complaints (admin only)"""
     query = select(Complaint).options(
         selectinload(Complaint.complainant),
         selectinload(Complaint.job)
-    ).order_by(Complaint.created_at.desc())
+    ).order_by(Complaint.created_at.desc(), Complaint.id.desc())
     
     if status:
         query = query.where(Complaint.status == status)
     
-    query = query.limit(limit).offset(offset)
+    keyset = after_cursor(Complaint.created_at, Complaint.id, cursor)
+    if keyset is not None:
+        query = query.where(keyset)
+    elif offset:
+        query = query.offset(offset)
     
-    result = await db.execute(query)
-    complaints = result.scalars().all()
+    result = await db.execute(query.limit(limit + 1))
+    complaints, next_cursor = split_page(result.scalars().all(), limit)
+    set_next_cursor(response, next_cursor)
     
     return complaints
 
@@ -395,7 +400,7 @@ async def resolve_complaint(
 @router.get("/financial-summary")
 async def get_financial_summary(
     current_user: User = Depends(require_admin),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get financial summary (admin only)"""
     
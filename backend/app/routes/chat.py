@@ -1,59 +1,212 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
-from typing import Dict, Set
+from typing import Dict, Optional, Set
+import asyncio
 import json
-from uuid import UUID
+import logging
+from uuid import UUID, uuid4
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.models.message import Message
 from app.models.job import Job
 from app.models.user import User
-from app.core.auth import get_current_user_ws
+from app.core.auth import get_current_user_ws, verify_token
+from app.core.config import settings
+from app.services.backplane import Backplane, backplane
+from app.services.ws_connection import ClientConnection
+from app.services.chat_service import ChatService, chat_writer, new_message_row, serialize_message
+from app.utils.pagination import set_next_cursor
 
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/chat", tags=["Chat"])
 
+CHAT_TOPIC = "chat"
+
 
 # Store active WebSocket connections per job
 class ConnectionManager:
-    def __init__(self):
-        # job_id -> set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    """
+    Tracks this worker's sockets per job. Broadcasts are delivered locally
+    and published on the backplane so workers holding other sockets for the
+    same job deliver them too.
+    """
+    
+    def __init__(self, backplane: Backplane):
+        # job_id -> {WebSocket: ClientConnection}
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.backplane = backplane
+        self.origin = uuid4().hex
+        self._closing: Set[asyncio.Task] = set()
+        self._user_connections: Dict[UUID, int] = {}
+        self.connection_count = 0
+        self.rejected = 0
+        self.evicted_slow = 0
+        self.idle_timeouts = 0
+        backplane.subscribe(CHAT_TOPIC, self._on_backplane_event)
     
-    async def connect(self, websocket: WebSocket, job_id: str):
+    async def connect(self, websocket: WebSocket, job_id: str, user_id: UUID) -> Optional[ClientConnection]:
+        """Accept and register a socket; None if a connection cap was hit"""
+        if (
+            self.connection_count >= settings.CHAT_MAX_CONNECTIONS
+            or self._user_connections.get(user_id, 0) >= settings.CHAT_MAX_CONNECTIONS_PER_USER
+        ):
+            self.rejected += 1
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many connections")
+            return None
+        
         await websocket.accept()
-        if job_id not in self.active_connections:
-            self.active_connections[job_id] = set()
-        self.active_connections[job_id].add(websocket)
+        connection = ClientConnection(websocket, job_id, user_id, self._on_send_failed, self._on_idle)
+        self.active_connections.setdefault(job_id, {})[websocket] = connection
+        self._user_connections[user_id] = self._user_connections.get(user_id, 0) + 1
+        self.connection_count += 1
+        connection.start()
+        return connection
     
     def disconnect(self, websocket: WebSocket, job_id: str):
-        if job_id in self.active_connections:
-            self.active_connections[job_id].discard(websocket)
-            if not self.active_connections[job_id]:
-                del self.active_connections[job_id]
+        room = self.active_connections.get(job_id)
+        if room is None:
+            return
+        connection = room.pop(websocket, None)
+        if connection is not None:
+            connection.stop()
+            self.connection_count -= 1
+            remaining = self._user_connections.get(connection.user_id, 1) - 1
+            if remaining > 0:
+                self._user_connections[connection.user_id] = remaining
+            else:
+                self._user_connections.pop(connection.user_id, None)
+        if not room:
+            del self.active_connections[job_id]
+    
+    def send_personal(self, message: dict, websocket: WebSocket, job_id: str):
+        """Send a frame to one socket through its queue, keeping frame order"""
+        connection = self.active_connections.get(job_id, {}).get(websocket)
+        if connection is not None and not connection.enqueue(json.dumps(message, default=str)):
+            self._evict(connection)
+    
+    def _event(self, message: dict, job_id: str) -> dict:
+        return {"origin": self.origin, "job_id": job_id, "message": message}
+    
+    def fits(self, message: dict, job_id: str) -> bool:
+        """Whether a broadcast of ``message`` can reach every worker"""
+        return self.backplane.fits(CHAT_TOPIC, self._event(message, job_id))
     
     async def broadcast(self, message: dict, job_id: str, exclude: WebSocket = None):
+        self._deliver_local(json.dumps(message, default=str), job_id, exclude)
+        try:
+            await self.backplane.publish(CHAT_TOPIC, self._event(message, job_id))
+        except Exception as e:
+            logger.error(f"Chat backplane publish failed for job {job_id}: {e}")
+    
+    async def _on_backplane_event(self, event: dict):
+        # Our own publishes were already delivered locally
+        if event.get("origin") == self.origin:
+            return
+        job_id = str(event.get("job_id"))
         if job_id in self.active_connections:
-            for connection in self.active_connections[job_id]:
-                if connection != exclude:
-                    try:
-                        await connection.send_json(message)
-                    except:
-                        pass
+            self._deliver_local(json.dumps(event.get("message"), default=str), job_id)
+    
+    def _deliver_local(self, text: str, job_id: str, exclude: WebSocket = None):
+        # Serialized once above; each socket only gets a queue append
+        for websocket, connection in list(self.active_connections.get(job_id, {}).items()):
+            if websocket is exclude:
+                continue
+            if not connection.enqueue(text):
+                self._evict(connection)
+    
+    def _on_send_failed(self, connection: ClientConnection):
+        # Close too, or the endpoint keeps reading from a socket nobody writes to
+        self._drop(connection, status.WS_1011_INTERNAL_ERROR, "Send failed")
+    
+    def _on_idle(self, connection: ClientConnection):
+        logger.info(f"Closing idle chat connection for user {connection.user_id} on job {connection.room}")
+        self.idle_timeouts += 1
+        self._drop(connection, status.WS_1001_GOING_AWAY, "Idle timeout")
+    
+    def _evict(self, connection: ClientConnection):
+        logger.warning(f"Evicting slow chat consumer on job {connection.room}")
+        self.evicted_slow += 1
+        self._drop(connection, status.WS_1013_TRY_AGAIN_LATER, "Too slow")
+    
+    def _drop(self, connection: ClientConnection, code: int, reason: str):
+        # Closing also ends the endpoint's receive loop
+        self.disconnect(connection.websocket, connection.room)
+        task = asyncio.create_task(self.close(connection.websocket, code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    async def close(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            # Bounded: the close frame can stall like any other send
+            await asyncio.wait_for(
+                websocket.close(code=code, reason=reason),
+                timeout=settings.CHAT_SEND_TIMEOUT_SECONDS
+            )
+        except Exception:
+            pass
+    
+    def stats(self) -> dict:
+        """Live socket gauge for /metrics"""
+        return {
+            "connections": self.connection_count,
+            "jobs": len(self.active_connections),
+            "users": len(self._user_connections),
+            "max_connections": settings.CHAT_MAX_CONNECTIONS,
+            "rejected": self.rejected,
+            "evicted_slow": self.evicted_slow,
+            "idle_timeouts": self.idle_timeouts,
+        }
+
 
+manager = ConnectionManager(backplane)
 
-manager = ConnectionManager()
+
+def _parse_message_id(raw) -> Optional[UUID]:
+    try:
+        return UUID(str(raw)) if raw else None
+    except ValueError:
+        return None
+
+
+async def _history_frame(job_id: str, since: Optional[UUID]) -> dict:
+    """
+    Opening history for a socket: the latest page, or a ``sync`` page of
+    what followed ``since``. An unknown ``since`` gets a full ``history``
+    replace so the client never appends across a gap.
+    """
+    async with AsyncSessionLocal() as db:
+        chat_service = ChatService(db)
+        if since is None:
+            history, has_more = await chat_service.get_history(
+                UUID(job_id), limit=settings.CHAT_HISTORY_PAGE_SIZE
+            )
+            contiguous = False
+        else:
+            history, has_more, contiguous = await chat_service.get_delta(
+                UUID(job_id), since, limit=settings.CHAT_HISTORY_PAGE_SIZE
+            )
+    return {
+        # For "sync" has_more means newer pages remain; for "history", older ones
+        "type": "sync" if contiguous else "history",
+        "messages": history,
+        "has_more": has_more
+    }
 
 
 @router.websocket("/ws/{job_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
-    job_id: str,
-    db: AsyncSession = Depends(get_db)
+    job_id: str
 ):
-    """WebSocket endpoint for real-time chat"""
+    """
+    WebSocket endpoint for real-time chat.
+
+    Sessions are checked out per step (auth check, history, each inbound
+    frame) and returned straight away, so an idle socket holds no pool slot.
+    """
     user_id = None
     
     try:
@@ -66,8 +219,7 @@ async def websocket_endpoint(
         
         # Verify user from token
         try:
-            from app.core.auth import verify_token
-            payload = verify_token(token)
+            payload = await verify_token(token)
             user_id = UUID(payload.get("sub"))
             print(f"WebSocket: User {user_id} authenticated successfully")
         except Exception as auth_error:
@@ -77,10 +229,18 @@ async def websocket_endpoint(
         
         # Verify job exists and user is involved
         try:
-            result = await db.execute(
-                select(Job).where(Job.id == UUID(job_id))
-            )
-            job = result.scalar_one_or_none()
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Job.user_id, Job.assigned_genie, Job.status)
+                    .where(Job.id == UUID(job_id))
+                )
+                job = result.first()
+                if job:
+                    # Cached for the connection instead of looked up per message
+                    sender_result = await db.execute(
+                        select(User.name).where(User.id == user_id)
+                    )
+                    sender_name = sender_result.scalar_one_or_none() or "Unknown"
         except Exception as db_error:
             print(f"WebSocket job lookup error: {db_error}")
             await websocket.close(code=status.WS_1011_SERVER_ERROR, reason="DB error")
@@ -103,34 +263,19 @@ async def websocket_endpoint(
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Job status not allowed")
             return
         
-        await manager.connect(websocket, job_id)
+        connection = await manager.connect(websocket, job_id, user_id)
+        if connection is None:
+            logger.info(f"Chat connection limit reached for user {user_id}")
+            return
         print(f"WebSocket: Connected for job {job_id}, user {user_id}")
         
-        # Send chat history
+        # Send the latest page of history, or only the delta since the
+        # client's last seen message when it is reconnecting
         try:
-            messages_result = await db.execute(
-                select(Message, User.name)
-                .join(User, Message.sender_id == User.id)
-                .where(Message.job_id == UUID(job_id))
-                .order_by(Message.created_at.asc())
-            )
-            
-            history = []
-            for msg, sender_name in messages_result.all():
-                history.append({
-                    "id": str(msg.id),
-                    "sender_id": str(msg.sender_id),
-                    "sender_name": sender_name,
-                    "content": msg.content,
-                    "created_at": msg.created_at.isoformat(),
-                    "is_read": msg.is_read
-                })
-            
-            await websocket.send_json({
-                "type": "history",
-                "messages": history
-            })
-            print(f"WebSocket: Sent {len(history)} messages to user {user_id}")
+            since = _parse_message_id(websocket.query_params.get("since"))
+            frame = await _history_frame(job_id, since)
+            manager.send_personal(frame, websocket, job_id)
+            print(f"WebSocket: Sent {len(frame['messages'])} messages to user {user_id}")
         except Exception as history_error:
             print(f"WebSocket error sending history: {history_error}")
             await websocket.close(code=status.WS_1011_SERVER_ERROR, reason="Failed to load history")
@@ -139,58 +284,99 @@ async def websocket_endpoint(
         # Listen for messages
         while True:
             try:
+                # Any frame, including pongs to our pings, counts as activity;
+                # the connection's heartbeat closes sockets that stop answering
                 data = await websocket.receive_json()
+                connection.touch()
+                
+                if data.get("type") == "pong":
+                    continue
                 
-                if data.get("type") == "message":
+                elif data.get("type") == "ping":
+                    manager.send_personal({"type": "pong"}, websocket, job_id)
+                
+                elif data.get("type") == "message":
                     content = data.get("content", "").strip()
                     if not content:
                         continue
+                    if len(content) > settings.CHAT_MAX_MESSAGE_LENGTH:
+                        manager.send_personal({
+                            "type": "error",
+                            "message": f"Message exceeds {settings.CHAT_MAX_MESSAGE_LENGTH} characters"
+                        }, websocket, job_id)
+                        continue
                     
-                    # Save message to database
-                    new_message = Message(
-                        job_id=UUID(job_id),
-                        sender_id=user_id,
-                        content=content,
-                        is_read=False
-                    )
-                    db.add(new_message)
-                    await db.commit()
-                    await db.refresh(new_message)
-                    
-                    # Get sender name
-                    sender_result = await db.execute(
-                        select(User.name).where(User.id == user_id)
-                    )
-                    sender_name = sender_result.scalar_one()
-                    
-                    # Broadcast to all connections in this job
+                    row = new_message_row(UUID(job_id), user_id, content)
                     message_data = {
                         "type": "new_message",
-                        "message": {
-                            "id": str(new_message.id),
-                            "sender_id": str(new_message.sender_id),
-                            "sender_name": sender_name,
-                            "content": new_message.content,
-                            "created_at": new_message.created_at.isoformat(),
-                            "is_read": new_message.is_read
-                        }
+                        "message": serialize_message(Message(**row), sender_name)
                     }
+                    if data.get("client_id"):
+                        # Lets the sender match the echo to its optimistic copy
+                        message_data["client_id"] = data.get("client_id")
+                    
+                    # Refuse before saving anything that could not reach the whole room
+                    if not manager.fits(message_data, job_id):
+                        manager.send_personal({
+                            "type": "error",
+                            "message": "Message is too large to deliver",
+                            "client_id": data.get("client_id")
+                        }, websocket, job_id)
+                        continue
+                    
+                    # Save message to database (batched with other sockets' messages)
+                    if settings.CHAT_PERSIST_MODE == "write_behind":
+                        chat_writer.write_nowait(row)
+                    else:
+                        try:
+                            await chat_writer.write(row)
+                        except Exception as write_error:
+                            logger.error(f"Failed to save chat message on job {job_id}: {write_error}")
+                            manager.send_personal({
+                                "type": "error",
+                                "message": "Message could not be saved",
+                                "client_id": data.get("client_id")
+                            }, websocket, job_id)
+                            continue
                     
+                    # Broadcast to all connections in this job
                     await manager.broadcast(message_data, job_id)
                     
+                elif data.get("type") == "sync":
+                    # Next delta page while a reconnect sync reported has_more
+                    after = _parse_message_id(data.get("after"))
+                    manager.send_personal(await _history_frame(job_id, after), websocket, job_id)
+                    
+                elif data.get("type") == "load_history":
+                    # Older page requested by the client (scroll-back)
+                    before = _parse_message_id(data.get("before"))
+                    async with AsyncSessionLocal() as db:
+                        history, has_more = await ChatService(db).get_history(
+                            UUID(job_id),
+                            before=before,
+                            limit=settings.CHAT_HISTORY_PAGE_SIZE
+                        )
+                    manager.send_personal({
+                        "type": "history_page",
+                        "messages": history,
+                        "has_more": has_more
+                    }, websocket, job_id)
+                    
                 elif data.get("type") == "mark_read":
                     # Mark messages as read
-                    await db.execute(
-                        Message.__table__.update()
-                        .where(
-                            and_(
-                                Message.job_id == UUID(job_id),
-                                Message.sender_id != user_id
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(
+                            Message.__table__.update()
+                            .where(
+                                and_(
+                                    Message.job_id == UUID(job_id),
+                                    Message.sender_id != user_id,
+                                    Message.is_read == False
+                                )
                             )
+                            .values(is_read=True)
                         )
-                        .values(is_read=True)
-                    )
-                    await db.commit()
+                        await db.commit()
             except json.JSONDecodeError:
                 print(f"WebSocket: Invalid JSON from user {user_id}")
                 continue
@@ -200,21 +386,30 @@ async def websocket_endpoint(
     
     except WebSocketDisconnect:
         print(f"WebSocket: User {user_id} disconnected from job {job_id}")
-        manager.disconnect(websocket, job_id)
     except Exception as e:
         print(f"WebSocket error for user {user_id} on job {job_id}: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # Also covers the loop breaking out on a message error
         manager.disconnect(websocket, job_id)
 
 
 @router.get("/{job_id}/messages")
 async def get_job_messages(
     job_id: str,
+    response: Response,
+    before: Optional[UUID] = Query(None),
+    after: Optional[UUID] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user_ws),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all messages for a job (REST endpoint as fallback)"""
+    """
+    Get a page of messages for a job (REST endpoint as fallback).
+    Without a cursor returns the latest messages; ``before`` pages back and
+    ``after`` returns only messages newer than the given message id.
+    """
     
     # Verify job exists and user is involved
     result = await db.execute(
@@ -228,23 +423,16 @@ async def get_job_messages(
     if job.user_id != current_user.id and job.assigned_genie != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get messages
-    messages_result = await db.execute(
-        select(Message, User.name)
-        .join(User, Message.sender_id == User.id)
-        .where(Message.job_id == UUID(job_id))
-        .order_by(Message.created_at.asc())
-    )
+    chat_service = ChatService(db)
+    if after:
+        # forward is False when the anchor is unknown and the latest page came back
+        messages, has_more, forward = await chat_service.get_delta(UUID(job_id), after, limit=limit)
+    else:
+        messages, has_more = await chat_service.get_history(UUID(job_id), before=before, limit=limit)
+        forward = False
     
-    messages = []
-    for msg, sender_name in messages_result.all():
-        messages.append({
-            "id": str(msg.id),
-            "sender_id": str(msg.sender_id),
-            "sender_name": sender_name,
-            "content": msg.content,
-            "created_at": msg.created_at.isoformat(),
-            "is_read": msg.is_read
-        })
+    # Cursor for the next page in the direction the query actually took
+    if has_more and messages:
+        set_next_cursor(response, messages[-1]["id"] if forward else messages[0]["id"])
     
     return messages
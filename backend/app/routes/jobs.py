@@ -1,20 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_user, get_read_db
 from app.core.roles import require_user, require_genie, require_any_role
+from app.core.idempotency import IdempotencyGuard, idempotency_guard
 from app.models.user import User
 from app.models.job import JobStatus
 from app.schemas.job import (
-    JobCreate, JobUpdate, JobResponse, JobWithDetails, 
+    JobCreate, JobUpdate, JobResponse, JobWithDetails, JobWithOffers,
     UserRatingRequest, UserRatingResponse
 )
 from app.services.job_service import JobService
 from app.services.atomic_job_service import AtomicJobService
 from app.services.ai_pricing import ai_pricing_service
+from app.utils.pagination import set_next_cursor
 
 
 router = APIRouter()
@@ -64,31 +66,49 @@ async def create_job(
 
 @router.get("/available", response_model=List[JobResponse])
 async def get_available_jobs(
-    limit: int = Query(50, le=100),
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     current_user: User = Depends(require_genie),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get available jobs for genies to accept"""
+    """
+    Get available jobs for genies to accept.
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next page.
+    """
     job_service = JobService(db)
-    jobs = await job_service.get_available_jobs(limit=limit, offset=offset)
+    jobs, next_cursor = await job_service.get_available_jobs(limit=limit, offset=offset, cursor=cursor)
+    set_next_cursor(response, next_cursor)
     return jobs
 
 
-@router.get("/my-jobs", response_model=List[JobResponse])
+@router.get("/my-jobs", response_model=List[JobWithOffers])
 async def get_my_jobs(
+    response: Response,
     status: Optional[JobStatus] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    include_offers: bool = Query(False),
     current_user: User = Depends(require_any_role),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get jobs posted by current user or assigned to current genie"""
+    """
+    Get jobs posted by current user or assigned to current genie, newest first.
+    Offers are only included when ``include_offers`` is set.
+    """
     job_service = JobService(db)
     
     if current_user.role == "user":
-        jobs = await job_service.get_jobs_by_user(current_user.id, status)
+        jobs, next_cursor = await job_service.get_jobs_by_user(
+            current_user.id, status, limit=limit, cursor=cursor, include_offers=include_offers
+        )
     else:  # genie
-        jobs = await job_service.get_jobs_assigned_to_genie(current_user.id, status)
+        jobs, next_cursor = await job_service.get_jobs_assigned_to_genie(
+            current_user.id, status, limit=limit, cursor=cursor, include_offers=include_offers
+        )
     
+    set_next_cursor(response, next_cursor)
     return jobs
 
 
@@ -149,6 +169,7 @@ async def delete_job(
 async def accept_job(
     job_id: UUID,
     current_user: User = Depends(require_genie),
+    guard: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -158,31 +179,37 @@ async def accept_job(
     - Validates user has sufficient wallet balance
     - Transfers job price from user balance to escrow
     - Creates notification for job owner
+    - Returns 409 if another genie is accepting the same job concurrently
     """
     job_service = JobService(db)
     
-    try:
-        result = await job_service.accept_job(
-            job_id=job_id,
-            genie_id=current_user.id,
-            genie_role=current_user.role
-        )
-        return result
-    except Exception as e:
-        # Convert service exceptions to HTTP exceptions
-        from app.utils.exceptions import (
-            JobNotFoundError, InvalidJobTransitionError, 
-            JobAlreadyAssignedError, InsufficientFundsError
-        )
+    async def accept():
+        try:
+            result = await job_service.accept_job(
+                job_id=job_id,
+                genie_id=current_user.id,
+                genie_role=current_user.role,
+                genie_name=current_user.name
+            )
+            return result
+        except Exception as e:
+            # Convert service exceptions to HTTP exceptions
+            from app.utils.exceptions import (
+                JobNotFoundError, InvalidJobTransitionError, 
+                InsufficientFundsError, ConflictError
+            )
         
-        if isinstance(e, JobNotFoundError):
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-        elif isinstance(e, (InvalidJobTransitionError, InsufficientFundsError)):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-        elif isinstance(e, JobAlreadyAssignedError):
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
-        else:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+            if isinstance(e, JobNotFoundError):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+            elif isinstance(e, (InvalidJobTransitionError, InsufficientFundsError)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            elif isinstance(e, ConflictError):
+                # Already assigned, or another accept holds the job right now
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+            else:
+                raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+    return await guard.run(accept)
 
 
 @router.post("/{job_id}/start", response_model=JobResponse)
@@ -205,16 +232,19 @@ async def start_job(
 async def complete_job(
     job_id: UUID,
     current_user: User = Depends(require_genie),
+    guard: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """Complete a job (atomic operation)"""
-    atomic_service = AtomicJobService(db)
-    job = await atomic_service.complete_job_atomically(job_id, current_user.id)
+    async def complete():
+        atomic_service = AtomicJobService(db)
+        job = await atomic_service.complete_job_atomically(job_id, current_user.id)
+        
+        # Load relationships for response
+        job_service = JobService(db)
+        return await job_service.get_job_by_id(job.id)
     
-    # Load relationships for response
-    job_service = JobService(db)
-    job = await job_service.get_job_by_id(job.id)
-    return job
+    return await guard.run(complete, response_model=JobResponse)
 
 
 @router.post("/{job_id}/cancel-assignment", response_model=JobResponse)
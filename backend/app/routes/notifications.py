@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
+from datetime import datetime
+import json
+import logging
 
-from app.database import get_db
-from app.core.auth import get_current_active_user
+from app.database import get_db, AsyncSessionLocal
+from app.core.auth import get_current_active_user, get_read_db, verify_token
 from app.core.roles import require_any_role
 from app.models.user import User
-from app.schemas.notification import NotificationResponse, NotificationListResponse
+from app.schemas.notification import NotificationResponse, NotificationListResponse, NotificationIdsRequest
 from app.services.notification_service import NotificationService
+from app.services.notification_hub import notification_hub
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
@@ -18,7 +23,7 @@ async def get_notifications(
     limit: int = 50,
     include_read: bool = False,
     current_user: User = Depends(require_any_role),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get notifications for current user"""
     notification_service = NotificationService(db)
@@ -69,3 +74,85 @@ async def mark_all_notifications_read(
         "message": f"Marked {count} notifications as read",
         "marked_count": count
     }
+
+
+@router.patch("/read")
+async def mark_notifications_read(
+    request: NotificationIdsRequest,
+    current_user: User = Depends(require_any_role),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mark a list of notifications as read"""
+    notification_service = NotificationService(db)
+    marked = await notification_service.mark_many_as_read(current_user.id, request.ids)
+    
+    return {
+        "message": f"Marked {len(marked)} notifications as read",
+        "marked_count": len(marked),
+        "marked_ids": marked
+    }
+
+
+@router.delete("/")
+async def delete_old_notifications(
+    before: datetime = Query(..., description="Delete notifications created before this time"),
+    include_unread: bool = False,
+    current_user: User = Depends(require_any_role),
+    db: AsyncSession = Depends(get_db)
+):
+    """Delete notifications older than a cutoff (read ones only unless include_unread)"""
+    notification_service = NotificationService(db)
+    count = await notification_service.delete_older_than(
+        current_user.id, before, include_unread=include_unread
+    )
+    
+    return {
+        "message": f"Deleted {count} notifications",
+        "deleted_count": count
+    }
+
+
+@router.websocket("/ws")
+async def notification_stream(websocket: WebSocket):
+    """
+    Push stream of the current user's notifications (replaces polling).
+
+    Sends the unread count on connect, then ``notification`` frames as they
+    are committed and ``read`` / ``read_all`` frames when they are marked
+    read elsewhere. Uses the chat heartbeat and idle-timeout settings.
+    """
+    token = websocket.query_params.get("token")
+    try:
+        payload = await verify_token(token) if token else None
+        user_id = UUID(payload.get("sub")) if payload else None
+    except Exception as e:
+        logger.info(f"Notification stream auth failed: {e}")
+        user_id = None
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Auth failed")
+        return
+    
+    connection = await notification_hub.connect(websocket, user_id)
+    if connection is None:
+        return
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            unread_count = await NotificationService(db).get_unread_count(user_id)
+        notification_hub.send_personal(
+            {"type": "unread_count", "unread_count": unread_count}, websocket, user_id
+        )
+        
+        while True:
+            # Clients only send heartbeats; anything counts as activity and
+            # the connection's heartbeat closes sockets that stop answering
+            data = await websocket.receive_json()
+            connection.touch()
+            if data.get("type") == "ping":
+                notification_hub.send_personal({"type": "pong"}, websocket, user_id)
+    except (WebSocketDisconnect, json.JSONDecodeError):
+        pass
+    except Exception as e:
+        logger.error(f"Notification stream error for user {user_id}: {e}")
+    finally:
+        notification_hub.disconnect(websocket, user_id)
@@ -64,20 +64,16 @@ class OfferService:
         )
         
         self.db.add(offer)
-        await self.db.commit()
-        await self.db.refresh(offer)
         
         # Notify job owner about new offer
-        try:
-            notification_service = NotificationService(self.db)
-            await notification_service.create_notification(
-                user_id=job.user_id,
-                title="New offer received",
-                message=f"A Genie has made an offer of ₹{offer_data.offer_price} for your job '{job.title}'."
-            )
-            await self.db.commit()
-        except Exception as notification_error:
-            await self.db.rollback()
+        NotificationService(self.db).enqueue_notification(
+            user_id=job.user_id,
+            title="New offer received",
+            message=f"A Genie has made an offer of ₹{offer_data.offer_price} for your job '{job.title}'."
+        )
+        
+        await self.db.commit()
+        await self.db.refresh(offer)
         
         # Load relationships for response
         result = await self.db.execute(
@@ -6,12 +6,12 @@ import logging
 import json
 from pathlib import Path
 
-from app.database import get_db
-from app.core.auth import verify_jwt_token
+from app.database import get_db, bind_actor
+from app.core.auth import verify_jwt_token, invalidate_cached_user
 from app.core.roles import require_any_role
 from app.models.user import User
 from app.models.genie import Genie
-from app.models.notification import Notification
+from app.services.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -38,6 +38,7 @@ async def get_me(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    bind_actor(db, user_id)
     result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
     user = result.scalar_one_or_none()
 
@@ -87,6 +88,7 @@ async def get_me(
                 user.role = token_role
             await db.commit()
             await db.refresh(user)
+            invalidate_cached_user(user.id)
 
     genie_is_verified = False
     verification_status = None
@@ -120,6 +122,7 @@ async def update_me(
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    bind_actor(db, user_id)
     result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
     user = result.scalar_one_or_none()
     if not user:
@@ -132,6 +135,7 @@ async def update_me(
     user.name = new_name
     await db.commit()
     await db.refresh(user)
+    invalidate_cached_user(user.id)
 
     return {"id": str(user.id), "name": user.name, "role": user.role}
 
@@ -211,13 +215,10 @@ async def apply_genie_verification(
     genie_profile.verification_status = "PENDING"
     genie_profile.is_verified = False
 
-    db.add(
-        Notification(
-            user_id=current_user.id,
-            title="Verification Submitted",
-            message="Your verification request has been submitted and is under review.",
-            is_read=False,
-        )
+    NotificationService(db).enqueue_notification(
+        user_id=current_user.id,
+        title="Verification Submitted",
+        message="Your verification request has been submitted and is under review.",
     )
 
     await db.commit()
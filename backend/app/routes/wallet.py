@@ -1,18 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
+from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_active_user, get_read_db
 from app.core.roles import require_any_role
+from app.core.idempotency import IdempotencyGuard, idempotency_guard
 from app.models.user import User
 from app.models.wallet import Wallet
 from app.schemas.wallet import (
-    WalletResponse, TransactionRequest, TransactionResponse
+    WalletResponse, TransactionRequest, TransactionResponse, WalletTransactionResponse
 )
 from app.services.wallet_service import WalletService
+from app.utils.pagination import set_next_cursor
 
 router = APIRouter()
 
@@ -41,47 +44,59 @@ async def get_my_wallet(
 async def add_funds(
     transaction: TransactionRequest,
     current_user: User = Depends(require_any_role),
+    guard: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """Add funds to wallet balance"""
     wallet_service = WalletService(db)
-    result = await wallet_service.add_funds_atomically(
-        current_user.id,
-        transaction.amount,
-        transaction.description
+    return await guard.run(
+        lambda: wallet_service.add_funds_atomically(
+            current_user.id,
+            transaction.amount,
+            transaction.description
+        ),
+        payload=transaction,
+        response_model=TransactionResponse
     )
-    return result
 
 
 @router.post("/withdraw", response_model=TransactionResponse)
 async def withdraw_funds(
     transaction: TransactionRequest,
     current_user: User = Depends(require_any_role),
+    guard: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """Withdraw funds from wallet balance"""
     wallet_service = WalletService(db)
-    result = await wallet_service.withdraw_funds_atomically(
-        current_user.id,
-        transaction.amount,
-        transaction.description
+    return await guard.run(
+        lambda: wallet_service.withdraw_funds_atomically(
+            current_user.id,
+            transaction.amount,
+            transaction.description
+        ),
+        payload=transaction,
+        response_model=TransactionResponse
     )
-    return result
 
 
 @router.post("/transfer-to-escrow", response_model=TransactionResponse)
 async def transfer_to_escrow(
     transaction: TransactionRequest,
     current_user: User = Depends(require_any_role),
+    guard: IdempotencyGuard = Depends(idempotency_guard),
     db: AsyncSession = Depends(get_db)
 ):
     """Transfer funds from wallet balance to escrow (for job payments)"""
     wallet_service = WalletService(db)
-    result = await wallet_service.transfer_to_escrow_atomically(
-        current_user.id,
-        transaction.amount
+    return await guard.run(
+        lambda: wallet_service.transfer_to_escrow_atomically(
+            current_user.id,
+            transaction.amount
+        ),
+        payload=transaction,
+        response_model=TransactionResponse
     )
-    return result
 
 
 @router.post("/release-from-escrow", response_model=TransactionResponse)
@@ -113,3 +128,20 @@ async def get_balance(
         "escrow_balance": float(wallet.escrow_balance),
         "total_balance": float(wallet.balance + wallet.escrow_balance)
     }
+
+
+@router.get("/transactions", response_model=List[WalletTransactionResponse])
+async def get_transactions(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    current_user: User = Depends(require_any_role),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Wallet statement, newest first"""
+    wallet_service = WalletService(db)
+    transactions, next_cursor = await wallet_service.get_transactions(
+        current_user.id, limit=limit, cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+    return transactions
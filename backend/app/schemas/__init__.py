@@ -3,7 +3,7 @@ from app.schemas.user import (
     GenieProfile, GenieUpdate
 )
 from app.schemas.job import (
-    JobCreate, JobUpdate, JobResponse, JobWithDetails, JobStatus
+    JobCreate, JobUpdate, JobResponse, JobWithDetails, JobWithOffers, JobStatus
 )
 from app.schemas.offer import OfferCreate, OfferUpdate, OfferResponse
 from app.schemas.wallet import (
@@ -17,7 +17,7 @@ from app.schemas.complaint import (
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "UserProfile",
     "GenieProfile", "GenieUpdate",
-    "JobCreate", "JobUpdate", "JobResponse", "JobWithDetails", "JobStatus",
+    "JobCreate", "JobUpdate", "JobResponse", "JobWithDetails", "JobWithOffers", "JobStatus",
     "OfferCreate", "OfferUpdate", "OfferResponse",
     "WalletResponse", "WalletUpdate", "TransactionRequest", "TransactionResponse",
     "RatingCreate", "RatingUpdate", "RatingResponse",
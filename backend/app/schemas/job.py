@@ -60,11 +60,16 @@ class JobWithDetails(JobResponse):
     ratings: Optional[List["RatingResponse"]] = None
 
 
+class JobWithOffers(JobResponse):
+    offers: Optional[List["OfferResponse"]] = None
+
+
 # Forward references to avoid circular imports
 from app.schemas.offer import OfferResponse
 from app.schemas.rating import RatingResponse
 
 JobWithDetails.model_rebuild()
+JobWithOffers.model_rebuild()
 
 
 class UserRatingRequest(BaseModel):
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
@@ -27,3 +27,7 @@ class NotificationListResponse(BaseModel):
     notifications: List[NotificationResponse]
     unread_count: int
     total_count: int
+
+
+class NotificationIdsRequest(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=100)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
@@ -33,3 +34,18 @@ class TransactionResponse(BaseModel):
     success: bool
     message: str
     new_balance: Optional[Decimal] = None
+
+
+class WalletTransactionResponse(BaseModel):
+    id: UUID
+    kind: str
+    balance_delta: Decimal
+    escrow_delta: Decimal
+    balance_after: Decimal
+    escrow_after: Decimal
+    job_id: Optional[UUID] = None
+    description: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
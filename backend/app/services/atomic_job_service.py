@@ -1,17 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import selectinload
 from typing import Optional
 from uuid import UUID
 import logging
 
 from app.models.job import Job, JobStatus
+from app.models.message import Message
+from app.models.user import User
+from app.models.wallet import Wallet, WalletTransactionKind
 from app.services.notification_service import NotificationService
 from app.services.wallet_service import WalletService
-from app.utils.exceptions import JobNotFoundError, InvalidJobTransitionError, JobAlreadyAssignedError
+from app.utils.exceptions import (
+    JobNotFoundError, InvalidJobTransitionError, JobAlreadyAssignedError,
+    InsufficientFundsError, ConflictError
+)
+from app.utils.retry import retry_on_conflict, sqlstate_of
 
 logger = logging.getLogger(__name__)
 
+LOCK_NOT_AVAILABLE = "55P03"
+LOW_BALANCE_THRESHOLD = 500  # ₹; poster is nudged to top up below this
+
 
 class AtomicJobService:
     """Service for atomic job operations with proper locking"""
@@ -19,40 +30,116 @@ class AtomicJobService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def accept_job_atomically(self, job_id: UUID, genie_id: UUID) -> Job:
+    async def accept_job_atomically(
+        self,
+        job_id: UUID,
+        genie_id: UUID,
+        genie_name: Optional[str] = None
+    ) -> dict:
         """
-        Atomically accept a job using database transaction with row locking.
-        This prevents race conditions where multiple genies try to accept the same job.
+        Accept a job: lock the job, then the poster's wallet, move the price
+        to escrow, post the genie's greeting and queue the poster's
+        notifications, all in a single commit.
+
+        The job row is locked with NOWAIT, so a genie racing another accept
+        of the same job gets a 409 instead of queueing behind it and
+        re-checking a job that is already gone. The wallet lock waits as
+        usual: accepts of the poster's other jobs, top-ups and payouts on
+        that wallet are not conflicts.
         """
         try:
-            # Lock the job row for update to prevent concurrent modifications
-            result = await self.db.execute(
-                select(Job).where(Job.id == job_id).with_for_update()
-            )
+            try:
+                result = await self.db.execute(
+                    select(Job)
+                    .where(Job.id == job_id)
+                    .with_for_update(nowait=True)
+                    .execution_options(populate_existing=True)
+                )
+            except DBAPIError as e:
+                if sqlstate_of(e) == LOCK_NOT_AVAILABLE:
+                    raise ConflictError("This job is being accepted by someone else, try again")
+                raise
             job = result.scalar_one_or_none()
             
             if not job:
                 raise JobNotFoundError(f"Job {job_id} not found")
             
-            # Validate job status
             if job.status != JobStatus.POSTED:
                 raise InvalidJobTransitionError(
-                    f"Job {job_id} is not in POSTED status. Current status: {job.status}"
+                    f"Job must be in POSTED status to accept. Current status: {job.status}"
                 )
             
-            # Check if job is already assigned
             if job.assigned_genie is not None:
-                raise JobAlreadyAssignedError(f"Job {job_id} is already assigned")
+                raise JobAlreadyAssignedError("Job has already been assigned to another genie")
+            
+            if job.price is None or job.price <= 0:
+                raise InvalidJobTransitionError("Job must have a valid price to be accepted")
+            
+            # Job before wallet, the same order completion locks them in
+            result = await self.db.execute(
+                select(Wallet)
+                .where(Wallet.user_id == job.user_id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            wallet = result.scalar_one_or_none()
+            if not wallet:
+                raise InvalidJobTransitionError("Job poster does not have a wallet")
+            
+            job_price = job.price
+            if wallet.balance < job_price:
+                raise InsufficientFundsError(
+                    f"Insufficient wallet balance. Available: ₹{wallet.balance}, Required: ₹{job_price}"
+                )
+            
+            # Move the price into escrow; the wallet row is already locked
+            wallet.balance -= job_price
+            wallet.escrow_balance += job_price
+            WalletService(self.db).record_transaction(
+                wallet,
+                WalletTransactionKind.ESCROW_HOLD,
+                balance_delta=-job_price,
+                escrow_delta=job_price,
+                job_id=job_id,
+                description=f"Escrow for job '{job.title}'"
+            )
             
-            # Update job atomically
             job.assigned_genie = genie_id
             job.status = JobStatus.ACCEPTED
             
+            if genie_name is None:
+                genie_name = await self.db.scalar(select(User.name).where(User.id == genie_id))
+            self.db.add(Message(
+                job_id=job_id,
+                sender_id=genie_id,
+                content=f"Hello! I'm {genie_name or 'your Genie'} and I've accepted your job '{job.title}'. I'll review the details and reach out if I have any questions. Looking forward to working with you!",
+                is_read=False
+            ))
+            
+            notification_service = NotificationService(self.db)
+            notification_service.enqueue_notification(
+                user_id=job.user_id,
+                title="Your job has been accepted",
+                message=f"Your job '{job.title}' has been accepted by a Genie. ₹{job_price} has been moved to escrow."
+            )
+            if wallet.balance < LOW_BALANCE_THRESHOLD:
+                notification_service.enqueue_notification(
+                    user_id=job.user_id,
+                    title="Low wallet balance",
+                    message=f"Your wallet balance is low (₹{wallet.balance}). Please add funds to continue posting jobs."
+                )
+            
             await self.db.commit()
-            await self.db.refresh(job)
             
-            logger.info(f"Genie {genie_id} accepted job {job_id} atomically")
-            return job
+            logger.info(
+                f"Job {job_id} accepted by genie {genie_id}. "
+                f"Escrow: ₹{job_price} from user {job.user_id}"
+            )
+            return {
+                "message": "Job accepted successfully",
+                "escrow_amount": float(job_price),
+                "user_wallet_balance": float(wallet.balance)
+            }
             
         except Exception as e:
             await self.db.rollback()
@@ -89,24 +176,16 @@ class AtomicJobService:
             from datetime import datetime, timezone
             job.started_at = datetime.now(timezone.utc)
             
+            # Notify job owner (created by the outbox worker after commit)
+            NotificationService(self.db).enqueue_notification(
+                user_id=job.user_id,
+                title="Your job has started",
+                message=f"A Genie has started working on your job '{job.title}'."
+            )
+            
             await self.db.commit()
             await self.db.refresh(job)
             
-            # Notify job owner
-            try:
-                notification_service = NotificationService(self.db)
-                await notification_service.create_notification(
-                    user_id=job.user_id,
-                    title="Your job has started",
-                    message=f"A Genie has started working on your job '{job.title}'."
-                )
-                await self.db.commit()
-            except Exception as notification_error:
-                await self.db.rollback()
-                logger.warning(
-                    f"Job {job_id} start succeeded but owner notification failed: {notification_error}"
-                )
-            
             logger.info(f"Genie {genie_id} started job {job_id} atomically")
             return job
             
@@ -115,9 +194,12 @@ class AtomicJobService:
             logger.error(f"Failed to start job {job_id} atomically: {e}")
             raise
     
+    @retry_on_conflict()
     async def complete_job_atomically(self, job_id: UUID, genie_id: UUID) -> Job:
         """
         Atomically complete a job using database transaction with row locking.
+        The whole completion (job update, payout, ledger, notifications) is
+        re-run if Postgres aborts it on a deadlock.
         """
         try:
             result = await self.db.execute(
@@ -151,31 +233,24 @@ class AtomicJobService:
             from datetime import datetime, timezone
             job.completed_at = datetime.now(timezone.utc)
 
-            # Release escrow to genie as part of completion flow
+            # Notify job owner; committed together with the payout below
+            NotificationService(self.db).enqueue_notification(
+                user_id=job.user_id,
+                title="Job completed and payment released",
+                message=f"Your job '{job.title}' is complete. ₹{job.price} has been released from escrow to the Genie."
+            )
+
+            # Release escrow to genie as part of completion flow (commits)
             wallet_service = WalletService(self.db)
             await wallet_service.transfer_escrow_to_genie_atomically(
                 from_user_id=job.user_id,
                 to_genie_id=genie_id,
-                amount=job.price
+                amount=job.price,
+                job_id=job.id
             )
 
             await self.db.refresh(job)
             
-            # Notify job owner
-            try:
-                notification_service = NotificationService(self.db)
-                await notification_service.create_notification(
-                    user_id=job.user_id,
-                    title="Job completed and payment released",
-                    message=f"Your job '{job.title}' is complete. ₹{job.price} has been released from escrow to the Genie."
-                )
-                await self.db.commit()
-            except Exception as notification_error:
-                await self.db.rollback()
-                logger.warning(
-                    f"Job {job_id} completion succeeded but owner notification failed: {notification_error}"
-                )
-            
             logger.info(f"Genie {genie_id} completed job {job_id} atomically")
             return job
             
@@ -0,0 +1,179 @@
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+import asyncpg
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+# pg_notify rejects payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+
+class Backplane(ABC):
+    """
+    Fans out events to every worker process. Handlers subscribe per topic
+    and receive every published payload, including ones published by their
+    own process, so subscribers should skip events they originated.
+    """
+
+    # Largest encoded event the transport carries; None means unbounded
+    max_payload_bytes: Optional[int] = None
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def encode(self, topic: str, payload: dict) -> str:
+        # Raw UTF-8, not \u escapes: an emoji costs 4 bytes instead of 12
+        return json.dumps({"topic": topic, "payload": payload}, default=str, ensure_ascii=False)
+
+    def fits(self, topic: str, payload: dict) -> bool:
+        """Whether ``payload`` can be published in one piece"""
+        if self.max_payload_bytes is None:
+            return True
+        return len(self.encode(topic, payload).encode("utf-8")) <= self.max_payload_bytes
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: dict) -> None:
+        """Deliver ``payload`` to the topic's subscribers on every worker"""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def _dispatch(self, topic: str, payload: dict) -> None:
+        for handler in self._handlers.get(topic, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                logger.error(f"Backplane handler for {topic} failed: {e}")
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane; delivers synchronously to local subscribers"""
+
+    async def publish(self, topic: str, payload: dict) -> None:
+        await self._dispatch(topic, payload)
+
+
+class PostgresBackplane(Backplane):
+    """
+    Backplane over Postgres LISTEN/NOTIFY on one dedicated connection.
+
+    LISTEN needs a session-level connection, so point CHAT_BACKPLANE_DSN at
+    a direct or session-mode port when the main pool goes through a
+    transaction-pooling PgBouncer. If the connection drops it is re-opened
+    with backoff; events published meanwhile reach local subscribers only.
+    Events over the NOTIFY size limit are refused; check ``fits`` first.
+    """
+
+    max_payload_bytes = MAX_NOTIFY_PAYLOAD_BYTES
+
+    def __init__(self, dsn: str, channel: str = "do4u_events"):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.error(f"Backplane LISTEN connection failed, retrying in background: {e}")
+            self._schedule_reconnect()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def publish(self, topic: str, payload: dict) -> None:
+        data = self.encode(topic, payload)
+        if len(data.encode("utf-8")) > self.max_payload_bytes:
+            # Delivering locally would reach only part of the audience
+            raise ValueError(f"Backplane event on {topic} exceeds {self.max_payload_bytes} bytes")
+
+        conn = self._conn
+        if conn is None or conn.is_closed():
+            await self._dispatch(topic, payload)
+            return
+
+        try:
+            # One connection serves LISTEN and NOTIFY; asyncpg allows one
+            # in-flight query per connection
+            async with self._lock:
+                await conn.execute("SELECT pg_notify($1, $2)", self.channel, data)
+        except Exception as e:
+            logger.error(f"Backplane publish failed, delivering locally: {e}")
+            await self._dispatch(topic, payload)
+
+    async def _connect(self) -> None:
+        conn = await asyncpg.connect(self.dsn, timeout=10)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+        logger.info(f"Backplane listening on channel {self.channel}")
+
+    def _on_notify(self, connection, pid, channel, data) -> None:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            logger.error("Backplane received malformed payload")
+            return
+        asyncio.get_running_loop().create_task(
+            self._dispatch(event.get("topic"), event.get("payload") or {})
+        )
+
+    def _on_terminated(self, connection) -> None:
+        if not self._stopping:
+            logger.warning("Backplane LISTEN connection lost")
+            self._conn = None
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delay = 1.0
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+                return
+            except Exception as e:
+                logger.error(f"Backplane reconnect failed: {e}")
+                delay = min(delay * 2, 30.0)
+
+
+def _default_dsn() -> str:
+    # asyncpg wants a plain postgresql:// DSN without the SQLAlchemy driver suffix
+    return settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def create_backplane(kind: str) -> Backplane:
+    if kind == "postgres":
+        return PostgresBackplane(settings.CHAT_BACKPLANE_DSN or _default_dsn())
+    return InMemoryBackplane()
+
+
+backplane = create_backplane(settings.CHAT_BACKPLANE)
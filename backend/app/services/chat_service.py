@@ -0,0 +1,240 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, insert, tuple_
+from typing import List, Optional, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from app.models.message import Message
+from app.models.user import User
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_message(message: Message, sender_name: str) -> dict:
+    """Wire format shared by the WebSocket frames and the REST endpoint"""
+    return {
+        "id": str(message.id),
+        "sender_id": str(message.sender_id),
+        "sender_name": sender_name,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "is_read": message.is_read
+    }
+
+
+class ChatService:
+    """Service for reading chat history in cursor-sized pages"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _anchor(self, job_id: UUID, message_id: UUID) -> Optional[tuple]:
+        result = await self.db.execute(
+            select(Message.created_at, Message.id)
+            .where(Message.id == message_id)
+            .where(Message.job_id == job_id)
+        )
+        row = result.first()
+        return tuple(row) if row else None
+
+    async def get_history(
+        self,
+        job_id: UUID,
+        before: Optional[UUID] = None,
+        after: Optional[UUID] = None,
+        limit: int = 50
+    ) -> Tuple[List[dict], bool]:
+        """
+        Return a page of messages in chronological order and whether more
+        exist in the paging direction.
+
+        - no cursor: the latest ``limit`` messages (has_more = older exist)
+        - ``before``: the ``limit`` messages preceding that message
+        - ``after``: the ``limit`` messages following that message (delta sync)
+
+        An unknown cursor id falls back to the latest page.
+        """
+        anchor = None
+        if after or before:
+            anchor = await self._anchor(job_id, after or before)
+        return await self._page(job_id, anchor, bool(anchor and after), limit)
+
+    async def _page(
+        self,
+        job_id: UUID,
+        anchor: Optional[tuple],
+        forward: bool,
+        limit: int
+    ) -> Tuple[List[dict], bool]:
+        """Page after (``forward``) or before ``anchor``; no anchor means the latest page"""
+        query = (
+            select(Message, User.name)
+            .join(User, Message.sender_id == User.id)
+            .where(Message.job_id == job_id)
+        )
+        position = tuple_(Message.created_at, Message.id)
+
+        if forward:
+            query = query.where(position > tuple_(*anchor)).order_by(
+                Message.created_at.asc(), Message.id.asc()
+            )
+        else:
+            if anchor:
+                query = query.where(position < tuple_(*anchor))
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+
+        return [serialize_message(msg, sender_name) for msg, sender_name in rows], has_more
+
+    async def get_delta(
+        self,
+        job_id: UUID,
+        since: UUID,
+        limit: int = 50
+    ) -> Tuple[List[dict], bool, bool]:
+        """
+        Messages after ``since`` for a reconnecting client, plus has_more.
+        The last flag is False when ``since`` is unknown and the latest page
+        was returned instead; the client must then replace, not append.
+        """
+        anchor = await self._anchor(job_id, since)
+        contiguous = anchor is not None
+        messages, has_more = await self._page(job_id, anchor, contiguous, limit)
+        return messages, has_more, contiguous
+
+
+def new_message_row(job_id: UUID, sender_id: UUID, content: str) -> dict:
+    """
+    Column values for a chat message, with id and timestamp assigned here so
+    the message can be broadcast before it is persisted.
+    """
+    return {
+        "id": uuid4(),
+        "job_id": job_id,
+        "sender_id": sender_id,
+        "content": content,
+        "is_read": False,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+class ChatMessageWriter:
+    """
+    Buffers chat messages and persists them with multi-row INSERTs, flushed
+    once ``batch_size`` rows are pending or ``flush_interval`` seconds after
+    the first pending row, whichever comes first.
+
+    ``write`` waits until the row's batch is committed; ``write_nowait``
+    returns immediately (write-behind) and a crash can lose at most the rows
+    buffered since the last flush.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        batch_size: int = 100,
+        flush_interval: float = 0.02
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._buffer: List[Tuple[dict, Optional[asyncio.Future]]] = []
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and persist whatever is still buffered"""
+        self._stopping = True
+        self._pending.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while self._buffer:
+            await self._flush()
+
+    async def write(self, row: dict) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(row, future)
+        await future
+
+    def write_nowait(self, row: dict) -> None:
+        self._enqueue(row, None)
+
+    def _enqueue(self, row: dict, future: Optional[asyncio.Future]) -> None:
+        self._buffer.append((row, future))
+        self._pending.set()
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._pending.wait()
+            if not self._stopping:
+                try:
+                    # Give the batch a moment to fill before flushing
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush()
+
+    async def _flush(self) -> None:
+        batch = self._buffer[:self.batch_size]
+        self._buffer = self._buffer[self.batch_size:]
+        if not self._buffer:
+            self._pending.clear()
+        if len(self._buffer) < self.batch_size:
+            self._full.clear()
+        if not batch:
+            return
+
+        rows = [row for row, _ in batch]
+        try:
+            await self._insert(rows)
+            results = [None] * len(batch)
+        except Exception as e:
+            # One bad row (e.g. job deleted mid-chat) must not sink the rest
+            logger.error(f"Chat batch insert of {len(rows)} rows failed, retrying row by row: {e}")
+            results = []
+            for row in rows:
+                try:
+                    await self._insert([row])
+                    results.append(None)
+                except Exception as row_error:
+                    logger.error(f"Dropping chat message {row['id']}: {row_error}")
+                    results.append(row_error)
+
+        for (_, future), error in zip(batch, results):
+            if future is None or future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def _insert(self, rows: List[dict]) -> None:
+        async with self.session_factory() as db:
+            await db.execute(insert(Message).values(rows))
+            await db.commit()
+
+
+chat_writer = ChatMessageWriter(
+    AsyncSessionLocal,
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_FLUSH_MS / 1000
+)
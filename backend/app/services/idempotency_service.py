@@ -0,0 +1,139 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, event, func, or_, and_, null
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Any, Optional
+from uuid import UUID
+from datetime import timedelta
+import logging
+
+from app.core.config import settings
+from app.database import PrimarySession
+from app.models.idempotency import IdempotencyKey
+from app.utils.exceptions import ConflictError
+
+logger = logging.getLogger(__name__)
+
+# session.info key: (user_id, key) to mark applied in the session's next commit
+APPLY_KEY = "idempotency_key_to_apply"
+# session.info flag set once that commit went through
+APPLIED_KEY = "idempotency_key_applied"
+
+
+def mark_applied_on_commit(session: AsyncSession, user_id: UUID, key: str) -> None:
+    """
+    Flip ``key`` to "applied" inside the next transaction ``session``
+    commits, so the operation's effects and the marker land together and a
+    reservation can never be reclaimed once the operation went through.
+    """
+    session.info[APPLY_KEY] = (user_id, key)
+    session.info.pop(APPLIED_KEY, None)
+
+
+def was_applied(session: AsyncSession) -> bool:
+    """Whether the marker set by mark_applied_on_commit has been committed"""
+    return session.info.get(APPLIED_KEY, False)
+
+
+def clear_applied_marker(session: AsyncSession) -> None:
+    session.info.pop(APPLY_KEY, None)
+    session.info.pop(APPLIED_KEY, None)
+
+
+@event.listens_for(PrimarySession, "before_commit")
+def _apply_key_before_commit(session):
+    pending = session.info.get(APPLY_KEY)
+    if pending is not None:
+        user_id, key = pending
+        session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .values(status="applied")
+        )
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _key_applied(session):
+    if session.info.pop(APPLY_KEY, None) is not None:
+        session.info[APPLIED_KEY] = True
+
+
+class IdempotencyService:
+    """Service for reserving idempotency keys and storing their responses"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reserve(self, user_id: UUID, key: str, request_hash: str) -> Optional[IdempotencyKey]:
+        """
+        Claim ``key`` for a new request. Returns None when the caller now owns
+        the key, otherwise the existing record (in progress, applied or
+        completed).
+        Expired keys and in-progress keys abandoned past the lock timeout are
+        taken over in the same statement.
+        """
+        for _ in range(2):
+            statement = pg_insert(IdempotencyKey).values(
+                user_id=user_id,
+                key=key,
+                request_hash=request_hash,
+                status="in_progress",
+                expires_at=func.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+                set_={
+                    "request_hash": statement.excluded.request_hash,
+                    "status": "in_progress",
+                    "response_status": null(),
+                    "response_body": null(),
+                    "created_at": func.now(),
+                    "expires_at": statement.excluded.expires_at
+                },
+                where=or_(
+                    IdempotencyKey.expires_at < func.now(),
+                    and_(
+                        IdempotencyKey.status == "in_progress",
+                        IdempotencyKey.created_at
+                        < func.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+                    )
+                )
+            ).returning(IdempotencyKey.key)
+
+            result = await self.db.execute(statement)
+            claimed = result.first() is not None
+            await self.db.commit()
+            if claimed:
+                return None
+
+            result = await self.db.execute(
+                select(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id)
+                .where(IdempotencyKey.key == key)
+            )
+            existing = result.scalar_one_or_none()
+            if existing is not None:
+                return existing
+            # Released between our insert and read; try to claim it again
+        # Still churning after a retry: never run without a reservation row
+        raise ConflictError("A request with this Idempotency-Key is still in progress")
+
+    async def complete(self, user_id: UUID, key: str, response_status: int, response_body: Any) -> None:
+        """Store the response so replays return it without re-executing"""
+        await self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .values(status="completed", response_status=response_status, response_body=response_body)
+        )
+        await self.db.commit()
+
+    async def release(self, user_id: UUID, key: str) -> None:
+        """Forget a failed request so the client can retry it with the same key"""
+        await self.db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .where(IdempotencyKey.status == "in_progress")
+        )
+        await self.db.commit()
@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, and_
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy.orm import selectinload, aliased
+from typing import List, Optional, Tuple
 from uuid import UUID
 from enum import Enum
 import logging
@@ -9,14 +9,14 @@ import logging
 from app.models.job import Job, JobStatus
 from app.models.offer import Offer
 from app.models.user import User
-from app.models.message import Message
 from app.schemas.job import JobCreate, JobUpdate, UserRatingRequest
-from app.utils.exceptions import JobNotFoundError, InvalidJobTransitionError, JobAlreadyAssignedError, InsufficientFundsError
+from app.utils.exceptions import JobNotFoundError, InvalidJobTransitionError
+from app.utils.pagination import after_cursor, split_page
 from datetime import datetime
 from app.schemas.job import JobCreate, JobUpdate
-from app.services.wallet_service import WalletService
+from app.core.auth import invalidate_cached_user
+from app.services.atomic_job_service import AtomicJobService
 from app.services.notification_service import NotificationService
-from app.models.wallet import Wallet
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +45,36 @@ class JobLifecycleValidator:
         return cls.VALID_TRANSITIONS.get(current_status, [])
 
 
+# Columns exposed by JobResponse; the embedding vector is deliberately left out
+JOB_LIST_COLUMNS = (
+    Job.id, Job.user_id, Job.assigned_genie, Job.title, Job.description,
+    Job.location, Job.duration, Job.price, Job.status, Job.created_at,
+    Job.started_at, Job.completed_at, Job.genie_rating, Job.rating_comment,
+    Job.rated_at,
+)
+PROFILE_FIELDS = ("id", "name", "role", "reward_points", "created_at")
+
+_owner = aliased(User, name="job_owner")
+_genie = aliased(User, name="job_genie")
+
+
+def _profile_columns(user_alias) -> list:
+    return [getattr(user_alias, field) for field in PROFILE_FIELDS]
+
+
+def _job_row_to_dict(row) -> dict:
+    """Shape a projected job row like JobResponse (with nested profiles)"""
+    mapping = row._mapping
+    job = {column.key: mapping[column.key] for column in JOB_LIST_COLUMNS}
+    job["user"] = {field: mapping[f"owner_{field}"] for field in PROFILE_FIELDS}
+    job["genie"] = (
+        {field: mapping[f"genie_{field}"] for field in PROFILE_FIELDS}
+        if mapping["genie_id"] is not None
+        else None
+    )
+    return job
+
+
 class JobService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -77,49 +107,108 @@ class JobService:
         )
         return result.scalar_one_or_none()
     
-    async def get_jobs_by_user(self, user_id: UUID, status: Optional[JobStatus] = None) -> List[Job]:
-        """Get jobs posted by a user"""
-        query = select(Job).options(
-            selectinload(Job.user),
-            selectinload(Job.genie),
-            selectinload(Job.offers).selectinload(Offer.genie)
-        ).where(Job.user_id == user_id)
+    async def _list_jobs(
+        self,
+        filters: list,
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        include_offers: bool = False
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Newest-first page of jobs for list views, built from a single column
+        projection (job fields plus owner/genie profiles) instead of ORM
+        graphs. Offers are fetched in one extra query only when requested.
+        """
+        query = (
+            select(
+                *JOB_LIST_COLUMNS,
+                *[column.label(f"owner_{column.key}") for column in _profile_columns(_owner)],
+                *[column.label(f"genie_{column.key}") for column in _profile_columns(_genie)],
+            )
+            .join(_owner, _owner.id == Job.user_id)
+            .outerjoin(_genie, _genie.id == Job.assigned_genie)
+            .where(*filters)
+            .order_by(Job.created_at.desc(), Job.id.desc())
+            .limit(limit + 1)
+        )
         
-        if status:
-            query = query.where(Job.status == status)
+        keyset = after_cursor(Job.created_at, Job.id, cursor)
+        if keyset is not None:
+            query = query.where(keyset)
+        elif offset:
+            query = query.offset(offset)
         
         result = await self.db.execute(query)
-        return result.scalars().all()
-    
-    async def get_jobs_assigned_to_genie(self, genie_id: UUID, status: Optional[JobStatus] = None) -> List[Job]:
-        """Get jobs assigned to a genie"""
-        query = select(Job).options(
-            selectinload(Job.user),
-            selectinload(Job.genie),
-            selectinload(Job.offers).selectinload(Offer.genie)
-        ).where(Job.assigned_genie == genie_id)
+        rows, next_cursor = split_page(result.all(), limit)
+        jobs = [_job_row_to_dict(row) for row in rows]
+        
+        if include_offers and jobs:
+            offers_by_job = {job["id"]: [] for job in jobs}
+            offers_result = await self.db.execute(
+                select(Offer)
+                .options(selectinload(Offer.genie))
+                .where(Offer.job_id.in_(list(offers_by_job)))
+                .order_by(Offer.created_at.desc())
+            )
+            for offer in offers_result.scalars().all():
+                offers_by_job[offer.job_id].append(offer)
+            for job in jobs:
+                job["offers"] = offers_by_job[job["id"]]
         
+        return jobs, next_cursor
+    
+    async def get_jobs_by_user(
+        self,
+        user_id: UUID,
+        status: Optional[JobStatus] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        include_offers: bool = False
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of jobs posted by a user, newest first"""
+        filters = [Job.user_id == user_id]
         if status:
-            query = query.where(Job.status == status)
-        
-        result = await self.db.execute(query)
-        return result.scalars().all()
+            filters.append(Job.status == status)
+        return await self._list_jobs(filters, limit, cursor, include_offers=include_offers)
     
-    async def get_available_jobs(self, limit: int = 50, offset: int = 0) -> List[Job]:
-        """Get available jobs (POSTED status) for genies to accept"""
-        result = await self.db.execute(
-            select(Job)
-            .options(
-                selectinload(Job.user),
-                selectinload(Job.offers).selectinload(Offer.genie)
-            )
-            .where(Job.status == JobStatus.POSTED)
-            .where(Job.assigned_genie.is_(None))
-            .order_by(Job.created_at.desc())
-            .limit(limit)
-            .offset(offset)
-        )
-        return result.scalars().all()
+    async def get_jobs_assigned_to_genie(
+        self,
+        genie_id: UUID,
+        status: Optional[JobStatus] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        include_offers: bool = False
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of jobs assigned to a genie, newest first"""
+        filters = [Job.assigned_genie == genie_id]
+        if status:
+            filters.append(Job.status == status)
+        return await self._list_jobs(filters, limit, cursor, include_offers=include_offers)
+    
+    async def get_available_jobs(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get available jobs (POSTED status) for genies to accept.
+        Returns the page and the cursor for the next one.
+        """
+        filters = [Job.status == JobStatus.POSTED, Job.assigned_genie.is_(None)]
+        return await self._list_jobs(filters, limit, cursor, offset=offset)
+    
+    async def get_all_jobs(
+        self,
+        status: Optional[JobStatus] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of all jobs, optionally filtered by status (admin listing)"""
+        filters = [Job.status == status] if status else []
+        return await self._list_jobs(filters, limit, cursor, offset=offset)
     
     async def update_job_status(self, job_id: UUID, new_status: JobStatus) -> Job:
         """Update job status with validation"""
@@ -208,146 +297,19 @@ class JobService:
         self,
         job_id: UUID,
         genie_id: UUID,
-        genie_role: str
+        genie_role: str,
+        genie_name: Optional[str] = None
     ) -> dict:
         """
         Accept a job by a genie with wallet validation and escrow transfer.
         All operations happen in a single atomic transaction.
         """
-        # 1. Verify genie role
         if genie_role not in ["genie", "admin"]:
             raise InvalidJobTransitionError("Only genies can accept jobs")
         
-        # 2. Get genie user info
-        genie_result = await self.db.execute(
-            select(User).where(User.id == genie_id)
+        return await AtomicJobService(self.db).accept_job_atomically(
+            job_id, genie_id, genie_name=genie_name
         )
-        genie = genie_result.scalar_one_or_none()
-        
-        if not genie:
-            raise InvalidJobTransitionError("Genie user not found")
-        
-        # 3. Get job with user and wallet info
-        result = await self.db.execute(
-            select(Job)
-            .options(
-                selectinload(Job.user).selectinload(User.wallet)
-            )
-            .where(Job.id == job_id)
-        )
-        job = result.scalar_one_or_none()
-        
-        if not job:
-            raise JobNotFoundError(f"Job {job_id} not found")
-        
-        # 4. Verify job status is POSTED
-        if job.status != JobStatus.POSTED:
-            raise InvalidJobTransitionError(
-                f"Job must be in POSTED status to accept. Current status: {job.status}"
-            )
-        
-        # 5. Check if job is already assigned
-        if job.assigned_genie is not None:
-            raise JobAlreadyAssignedError("Job has already been assigned to another genie")
-        
-        # 6. Check if job has a price
-        if job.price is None or job.price <= 0:
-            raise InvalidJobTransitionError("Job must have a valid price to be accepted")
-        
-        # 7. Get user wallet
-        user = job.user
-        if not user or not user.wallet:
-            raise InvalidJobTransitionError("Job poster does not have a wallet")
-        
-        wallet = user.wallet
-        job_price = job.price
-        
-        # 8. Validate wallet balance
-        if wallet.balance < job_price:
-            raise InsufficientFundsError(
-                f"Insufficient wallet balance. Available: ₹{wallet.balance}, Required: ₹{job_price}"
-            )
-        
-        # 9. Perform atomic operations
-        try:
-            # Lock wallet row for update (prevent race conditions)
-            wallet_result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == user.id).with_for_update()
-            )
-            locked_wallet = wallet_result.scalar_one()
-            
-            # Double-check balance after locking
-            if locked_wallet.balance < job_price:
-                raise InsufficientFundsError(
-                    f"Insufficient wallet balance. Available: ₹{locked_wallet.balance}, Required: ₹{job_price}"
-                )
-            
-            # Deduct from balance and add to escrow
-            locked_wallet.balance -= job_price
-            locked_wallet.escrow_balance += job_price
-            
-            # Assign genie to job
-            job.assigned_genie = genie_id
-            job.status = JobStatus.ACCEPTED
-            
-            # Flush changes to DB
-            await self.db.flush()
-            
-            logger.info(
-                f"Job {job_id} accepted by genie {genie_id}. "
-                f"Escrow: ₹{job_price} from user {user.id}"
-            )
-            
-            # 10. Create automatic message from genie to user
-            auto_message = Message(
-                job_id=job_id,
-                sender_id=genie_id,
-                content=f"Hello! I'm {genie.name} and I've accepted your job '{job.title}'. I'll review the details and reach out if I have any questions. Looking forward to working with you!",
-                is_read=False
-            )
-            self.db.add(auto_message)
-            
-            # 11. Create notification for user (after main transaction flush)
-            notification_service = NotificationService(self.db)
-            await notification_service.create_notification(
-                user_id=user.id,
-                title="Your job has been accepted",
-                message=f"Your job '{job.title}' has been accepted by a Genie. ₹{job_price} has been moved to escrow."
-            )
-            
-            # Commit all changes
-            await self.db.commit()
-            await self.db.refresh(locked_wallet)
-            
-            # Check for low balance and notify user
-            if locked_wallet.balance < 500:  # Threshold: ₹500
-                try:
-                    notification_service = NotificationService(self.db)
-                    await notification_service.create_notification(
-                        user_id=user.id,
-                        title="Low wallet balance",
-                        message=f"Your wallet balance is low (₹{locked_wallet.balance}). Please add funds to continue posting jobs."
-                    )
-                    await self.db.commit()
-                except Exception as notification_error:
-                    await self.db.rollback()
-                    logger.warning(
-                        f"Job {job_id} accepted but low-balance notification failed for user {user.id}: {notification_error}"
-                    )
-            
-            return {
-                "message": "Job accepted successfully",
-                "escrow_amount": float(job_price),
-                "user_wallet_balance": float(locked_wallet.balance)
-            }
-            
-        except InsufficientFundsError:
-            await self.db.rollback()
-            raise
-        except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Failed to accept job {job_id}: {e}")
-            raise InvalidJobTransitionError(f"Failed to accept job: {str(e)}")
 
     async def rate_user(self, job_id: UUID, rating_data: UserRatingRequest, genie_id: UUID) -> dict:
         # 1. Get job and verify
@@ -387,24 +349,18 @@ class JobService:
         user = job.user
         user.reward_points += points_awarded
 
-        # 8. Commit everything in one transaction
+        # 8. Notify user about rating received
+        NotificationService(self.db).enqueue_notification(
+            user_id=user.id,
+            title="You received a rating",
+            message=f"A Genie rated you {rating_data.rating} stars for job '{job.title}'. You earned {points_awarded} reward points!"
+        )
+
+        # 9. Commit everything in one transaction
         await self.db.commit()
         await self.db.refresh(user)
-        
-        # 9. Notify user about rating received
-        notification_service = NotificationService(self.db)
-        try:
-            await notification_service.create_notification(
-                user_id=user.id,
-                title="You received a rating",
-                message=f"A Genie rated you {rating_data.rating} stars for job '{job.title}'. You earned {points_awarded} reward points!"
-            )
-            await self.db.commit()
-        except Exception as notification_error:
-            await self.db.rollback()
-            logger.warning(
-                f"Rating saved for job {job_id} but notification failed for user {user.id}: {notification_error}"
-            )
+        # The identity cache snapshots reward_points
+        invalidate_cached_user(user.id)
 
         return {
             "message": "Rating submitted successfully",
@@ -0,0 +1,131 @@
+from fastapi import WebSocket, status
+from typing import Dict, Optional, Set
+from uuid import UUID
+import asyncio
+import json
+import logging
+
+from app.core.config import settings
+from app.services.backplane import Backplane, backplane
+from app.services.ws_connection import ClientConnection
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_TOPIC = "notifications"
+
+
+class NotificationHub:
+    """
+    Per-user notification sockets held by this worker. Events are published
+    on the backplane and every worker (this one included) delivers them to
+    the sockets it holds for that user.
+    """
+
+    def __init__(self, backplane: Backplane):
+        # user_id -> {WebSocket: ClientConnection}
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.backplane = backplane
+        self.connection_count = 0
+        self.rejected = 0
+        self.evicted_slow = 0
+        self.idle_timeouts = 0
+        self._closing: Set[asyncio.Task] = set()
+        backplane.subscribe(NOTIFICATIONS_TOPIC, self._on_backplane_event)
+
+    async def connect(self, websocket: WebSocket, user_id: UUID) -> Optional[ClientConnection]:
+        """Accept and register a socket; None if a connection cap was hit"""
+        key = str(user_id)
+        if (
+            self.connection_count >= settings.NOTIFICATION_MAX_CONNECTIONS
+            or len(self.active_connections.get(key, {})) >= settings.NOTIFICATION_MAX_CONNECTIONS_PER_USER
+        ):
+            self.rejected += 1
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many connections")
+            return None
+
+        await websocket.accept()
+        connection = ClientConnection(websocket, key, user_id, self._on_send_failed, self._on_idle)
+        self.active_connections.setdefault(key, {})[websocket] = connection
+        self.connection_count += 1
+        connection.start()
+        return connection
+
+    def disconnect(self, websocket: WebSocket, user_id: UUID):
+        key = str(user_id)
+        sockets = self.active_connections.get(key)
+        if sockets is None:
+            return
+        connection = sockets.pop(websocket, None)
+        if connection is not None:
+            connection.stop()
+            self.connection_count -= 1
+        if not sockets:
+            del self.active_connections[key]
+
+    def send_personal(self, message: dict, websocket: WebSocket, user_id: UUID):
+        connection = self.active_connections.get(str(user_id), {}).get(websocket)
+        if connection is not None and not connection.enqueue(json.dumps(message, default=str)):
+            self._evict(connection)
+
+    async def publish(self, user_id: UUID, event: dict):
+        """Push an event to every open socket of ``user_id`` on any worker"""
+        try:
+            await self.backplane.publish(NOTIFICATIONS_TOPIC, {
+                "user_id": str(user_id),
+                "event": event
+            })
+        except Exception as e:
+            logger.error(f"Notification push failed for user {user_id}: {e}")
+
+    async def _on_backplane_event(self, payload: dict):
+        sockets = self.active_connections.get(str(payload.get("user_id")))
+        if not sockets:
+            return
+        text = json.dumps(payload.get("event"), default=str)
+        for connection in list(sockets.values()):
+            if not connection.enqueue(text):
+                self._evict(connection)
+
+    def _on_send_failed(self, connection: ClientConnection):
+        # Close too, or the endpoint keeps reading from a socket nobody writes to
+        self._drop(connection, status.WS_1011_INTERNAL_ERROR, "Send failed")
+
+    def _on_idle(self, connection: ClientConnection):
+        self.idle_timeouts += 1
+        self._drop(connection, status.WS_1001_GOING_AWAY, "Idle timeout")
+
+    def _evict(self, connection: ClientConnection):
+        logger.warning(f"Evicting slow notification consumer for user {connection.user_id}")
+        self.evicted_slow += 1
+        self._drop(connection, status.WS_1013_TRY_AGAIN_LATER, "Too slow")
+
+    def _drop(self, connection: ClientConnection, code: int, reason: str):
+        # Closing also ends the endpoint's receive loop
+        self.disconnect(connection.websocket, connection.user_id)
+        task = asyncio.create_task(self.close(connection.websocket, code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            # Bounded: the close frame can stall like any other send
+            await asyncio.wait_for(
+                websocket.close(code=code, reason=reason),
+                timeout=settings.CHAT_SEND_TIMEOUT_SECONDS
+            )
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """Live socket gauge for /metrics"""
+        return {
+            "connections": self.connection_count,
+            "users": len(self.active_connections),
+            "max_connections": settings.NOTIFICATION_MAX_CONNECTIONS,
+            "rejected": self.rejected,
+            "evicted_slow": self.evicted_slow,
+            "idle_timeouts": self.idle_timeouts,
+        }
+
+
+notification_hub = NotificationHub(backplane)
@@ -0,0 +1,63 @@
+from typing import Optional
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services.notification_service import NotificationService, outbox_ready
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutboxWorker:
+    """
+    Drains notification_outbox into notifications and pushes them. Woken
+    right after local commits that wrote outbox rows; the poll interval
+    picks up rows written by other worker processes.
+    """
+
+    def __init__(self, poll_interval: float, batch_size: int):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def drain(self) -> int:
+        """Process outbox rows until none are left. Returns rows processed."""
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                processed = await NotificationService(db).process_outbox(self.batch_size)
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(outbox_ready.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            outbox_ready.clear()
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.error(f"Notification outbox processing failed: {e}")
+
+
+notification_outbox = NotificationOutboxWorker(
+    poll_interval=settings.NOTIFICATION_OUTBOX_POLL_SECONDS,
+    batch_size=settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+)
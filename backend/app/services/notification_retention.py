@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationRetentionWorker:
+    """
+    Periodically moves read notifications older than ``retention_days`` to
+    notifications_archive so the hot table only holds recent and unread rows.
+    Works in short batches so each transaction holds its row locks briefly.
+    """
+
+    def __init__(self, retention_days: int, interval: float, batch_size: int):
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.retention_days <= 0:
+            logger.info("Notification retention disabled")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Archive everything currently past the window. Returns rows moved."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        total = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                moved = await NotificationService(db).archive_read_before(cutoff, self.batch_size)
+            total += moved
+            if moved < self.batch_size:
+                break
+            # Yield between batches so request traffic keeps its share of the pool
+            await asyncio.sleep(0)
+        if total:
+            logger.info(f"Archived {total} read notifications older than {cutoff}")
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Notification retention run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+notification_retention = NotificationRetentionWorker(
+    retention_days=settings.NOTIFICATION_RETENTION_DAYS,
+    interval=settings.NOTIFICATION_RETENTION_INTERVAL_SECONDS,
+    batch_size=settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+)
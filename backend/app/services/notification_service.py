@@ -1,13 +1,108 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import select, insert, update, delete, event, func
+from typing import Dict, Optional, List, Sequence, Set
 from uuid import UUID
+from datetime import datetime, timezone
+import asyncio
 import logging
 
-from app.models.notification import Notification
+from app.core.config import settings
+from app.database import AsyncSessionLocal, PrimarySession, is_replica_session
+from app.models.notification import Notification, NotificationArchive, NotificationOutbox
+from app.schemas.notification import NotificationResponse
+from app.services.backplane import backplane
+from app.services.notification_hub import NOTIFICATIONS_TOPIC, notification_hub
+from app.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# session.info key for notifications to push once their transaction commits
+PENDING_PUSHES_KEY = "pending_notification_pushes"
+# session.info flag: this transaction wrote outbox rows
+OUTBOX_WRITTEN_KEY = "notification_outbox_written"
+
+# Set after a local commit wrote outbox rows so the worker drains them now
+# instead of at its next poll
+outbox_ready = asyncio.Event()
+
+_push_tasks: Set[asyncio.Task] = set()
+
+# user_id -> unread count. Seeded by COUNT queries and adjusted by the push
+# events every worker receives, so it stays current without re-counting.
+unread_counts = LRUCache(
+    settings.UNREAD_COUNT_CACHE_MAX_SIZE,
+    default_ttl=settings.UNREAD_COUNT_CACHE_TTL_SECONDS
+)
+
+# user_id -> [seed COUNTs in flight, push events seen]. An event arriving
+# while a COUNT runs finds no cached value to adjust; the seed must then be
+# discarded or it would cache a count missing that change for the whole TTL.
+_seed_watch: Dict[str, List[int]] = {}
+
+
+def _begin_seed(key: str) -> int:
+    entry = _seed_watch.setdefault(key, [0, 0])
+    entry[0] += 1
+    return entry[1]
+
+
+def _end_seed(key: str, events_before: int) -> bool:
+    """Finish a seed; True if no event for ``key`` arrived during it"""
+    entry = _seed_watch[key]
+    clean = entry[1] == events_before
+    entry[0] -= 1
+    if not entry[0]:
+        del _seed_watch[key]
+    return clean
+
+
+def serialize_notification(notification: Notification) -> dict:
+    return NotificationResponse.model_validate(notification).model_dump(mode="json")
+
+
+async def _push_notifications(pending: List[tuple]) -> None:
+    for user_id, data in pending:
+        await notification_hub.publish(user_id, {"type": "notification", "notification": data})
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _push_after_commit(session):
+    if session.info.pop(OUTBOX_WRITTEN_KEY, False):
+        outbox_ready.set()
+    pending = session.info.pop(PENDING_PUSHES_KEY, None)
+    if pending:
+        task = asyncio.get_running_loop().create_task(_push_notifications(pending))
+        _push_tasks.add(task)
+        task.add_done_callback(_push_tasks.discard)
+
+
+@event.listens_for(PrimarySession, "after_rollback")
+def _drop_after_rollback(session):
+    # Rolled-back notifications never existed; don't announce them
+    session.info.pop(PENDING_PUSHES_KEY, None)
+    session.info.pop(OUTBOX_WRITTEN_KEY, None)
+
+
+async def _track_unread_count(payload: dict) -> None:
+    key = str(payload.get("user_id"))
+    event_type = (payload.get("event") or {}).get("type")
+    watch = _seed_watch.get(key)
+    if watch is not None:
+        watch[1] += 1
+    if event_type == "notification":
+        unread_counts.adjust(key, lambda count: count + 1)
+    elif event_type == "read":
+        read = len(payload["event"].get("ids", []))
+        unread_counts.adjust(key, lambda count: max(0, count - read))
+    elif event_type == "read_all":
+        unread_counts.set(key, 0)
+    elif event_type == "deleted":
+        removed = payload["event"].get("unread_removed", 0)
+        unread_counts.adjust(key, lambda count: max(0, count - removed))
+
+
+backplane.subscribe(NOTIFICATIONS_TOPIC, _track_unread_count)
+
 
 class NotificationService:
     """Service for managing user notifications"""
@@ -15,6 +110,15 @@ class NotificationService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    def enqueue_notification(self, user_id: UUID, title: str, message: str) -> None:
+        """
+        Queue a notification in the caller's transaction. It is only created
+        (by the outbox worker) if that transaction commits, and creating it
+        can never fail or slow down the business operation.
+        """
+        self.db.add(NotificationOutbox(user_id=user_id, title=title, message=message))
+        self.db.info[OUTBOX_WRITTEN_KEY] = True
+    
     async def create_notification(
         self,
         user_id: UUID,
@@ -22,21 +126,54 @@ class NotificationService:
         message: str
     ) -> Notification:
         """
-        Create a new notification for a user.
-        This operation is non-transactional (runs in separate commit)
-        to avoid interfering with main business logic transactions.
+        Create a new notification for a user in the current transaction.
+        It is pushed to the user's open notification sockets once the
+        caller's transaction commits.
         """
-        notification = Notification(
-            user_id=user_id,
-            title=title,
-            message=message,
-            is_read=False
-        )
-        self.db.add(notification)
+        notifications = await self.create_notifications([(user_id, title, message)])
+        return notifications[0]
+    
+    async def create_notifications(self, items: Sequence[tuple]) -> List[Notification]:
+        """Create ``(user_id, title, message)`` notifications with a single flush"""
+        notifications = [
+            Notification(user_id=user_id, title=title, message=message, is_read=False)
+            for user_id, title, message in items
+        ]
+        self.db.add_all(notifications)
         await self.db.flush()
+        self.db.info.setdefault(PENDING_PUSHES_KEY, []).extend(
+            (notification.user_id, serialize_notification(notification))
+            for notification in notifications
+        )
         
-        logger.info(f"Created notification for user {user_id}: {title}")
-        return notification
+        logger.info(f"Created {len(notifications)} notifications")
+        return notifications
+    
+    async def process_outbox(self, batch_size: int = 100) -> int:
+        """
+        Turn up to ``batch_size`` outbox rows into notifications and delete
+        them, in one transaction. Returns rows processed. SKIP LOCKED lets
+        every worker process drain the outbox concurrently.
+        """
+        result = await self.db.execute(
+            select(NotificationOutbox)
+            .order_by(NotificationOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.scalars().all()
+        if not rows:
+            await self.db.rollback()
+            return 0
+        
+        await self.create_notifications([(row.user_id, row.title, row.message) for row in rows])
+        await self.db.execute(
+            delete(NotificationOutbox)
+            .where(NotificationOutbox.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return len(rows)
     
     async def get_user_notifications(
         self,
@@ -65,33 +202,146 @@ class NotificationService:
         notification = result.scalar_one_or_none()
         
         if notification:
+            was_unread = not notification.is_read
             notification.is_read = True
             await self.db.commit()
             await self.db.refresh(notification)
             logger.info(f"Marked notification {notification_id} as read")
+            if was_unread:
+                # Keeps counters and the user's other tabs in sync
+                await notification_hub.publish(user_id, {"type": "read", "ids": [str(notification_id)]})
         
         return notification
     
     async def mark_all_as_read(self, user_id: UUID) -> int:
         """Mark all notifications as read for a user. Returns count updated."""
-        notifications = await self.get_user_notifications(user_id, include_read=False)
-        
-        count = 0
-        for notification in notifications:
-            notification.is_read = True
-            count += 1
+        result = await self.db.execute(
+            update(Notification)
+            .where(Notification.user_id == user_id)
+            .where(Notification.is_read == False)
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
         
+        count = result.rowcount
         if count > 0:
-            await self.db.commit()
             logger.info(f"Marked {count} notifications as read for user {user_id}")
+            await notification_hub.publish(user_id, {"type": "read_all"})
         
         return count
     
-    async def get_unread_count(self, user_id: UUID) -> int:
-        """Get count of unread notifications for a user"""
+    async def mark_many_as_read(self, user_id: UUID, notification_ids: Sequence[UUID]) -> List[UUID]:
+        """Mark the given notifications as read. Returns the ids that were unread."""
         result = await self.db.execute(
-            select(Notification).where(
-                (Notification.user_id == user_id) & (Notification.is_read == False)
+            update(Notification)
+            .where(Notification.user_id == user_id)
+            .where(Notification.id.in_(notification_ids))
+            .where(Notification.is_read == False)
+            .values(is_read=True)
+            .returning(Notification.id)
+            .execution_options(synchronize_session=False)
+        )
+        marked = list(result.scalars().all())
+        await self.db.commit()
+        
+        if marked:
+            logger.info(f"Marked {len(marked)} notifications as read for user {user_id}")
+            await notification_hub.publish(user_id, {"type": "read", "ids": [str(i) for i in marked]})
+        
+        return marked
+    
+    async def delete_older_than(self, user_id: UUID, before: datetime, include_unread: bool = False) -> int:
+        """Delete a user's notifications created before ``before``. Returns count deleted."""
+        if before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+        query = (
+            delete(Notification)
+            .where(Notification.user_id == user_id)
+            .where(Notification.created_at < before)
+        )
+        if not include_unread:
+            query = query.where(Notification.is_read == True)
+        
+        result = await self.db.execute(
+            query.returning(Notification.is_read).execution_options(synchronize_session=False)
+        )
+        deleted = result.scalars().all()
+        await self.db.commit()
+        
+        if deleted:
+            logger.info(f"Deleted {len(deleted)} notifications older than {before} for user {user_id}")
+            await notification_hub.publish(user_id, {
+                "type": "deleted",
+                "before": before.isoformat(),
+                # Clients drop only what the server dropped; ids could overflow NOTIFY
+                "include_unread": include_unread,
+                "unread_removed": sum(1 for is_read in deleted if not is_read)
+            })
+        
+        return len(deleted)
+    
+    async def archive_read_before(self, cutoff: datetime, batch_size: int = 1000) -> int:
+        """
+        Move up to ``batch_size`` read notifications created before ``cutoff``
+        into notifications_archive in one statement. Returns rows moved.
+        SKIP LOCKED lets several workers run this concurrently.
+        """
+        batch = (
+            select(Notification.id)
+            .where(Notification.is_read == True)
+            .where(Notification.created_at < cutoff)
+            .order_by(Notification.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(Notification)
+            .where(Notification.id.in_(batch.scalar_subquery()))
+            .returning(
+                Notification.id,
+                Notification.user_id,
+                Notification.title,
+                Notification.message,
+                Notification.is_read,
+                Notification.created_at
+            )
+            .cte("moved")
+        )
+        columns = ["id", "user_id", "title", "message", "is_read", "created_at"]
+        result = await self.db.execute(
+            insert(NotificationArchive).from_select(
+                columns, select(*(moved.c[name] for name in columns))
             )
         )
-        return len(result.scalars().all())
+        await self.db.commit()
+        return result.rowcount
+    
+    async def get_unread_count(self, user_id: UUID) -> int:
+        """Get count of unread notifications for a user"""
+        cached = unread_counts.get(str(user_id))
+        if cached is not None:
+            return cached
+        
+        # Answered from the partial index on unread rows
+        query = (
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.user_id == user_id)
+            .where(Notification.is_read == False)
+        )
+        key = str(user_id)
+        events_before = _begin_seed(key)
+        try:
+            if is_replica_session(self.db):
+                # Seed from the primary: a lagging replica's count would stay
+                # cached (and be adjusted from) for the whole TTL
+                async with AsyncSessionLocal() as primary:
+                    count = (await primary.execute(query)).scalar_one()
+            else:
+                count = (await self.db.execute(query)).scalar_one()
+        finally:
+            clean = _end_seed(key, events_before)
+        if clean:
+            unread_counts.set(key, count)
+        return count
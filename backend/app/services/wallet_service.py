@@ -1,15 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from typing import Optional
+from sqlalchemy import select, insert, update, func, literal, String, Numeric
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID
+from typing import Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 from decimal import Decimal
 import logging
 
-from app.models.wallet import Wallet
+from app.models.wallet import Wallet, WalletTransaction, WalletTransactionKind
 from app.models.job import Job, JobStatus
 from app.schemas.wallet import TransactionRequest, TransactionResponse
 from app.utils.exceptions import InsufficientFundsError, WalletNotFoundError
 from app.services.notification_service import NotificationService
+from app.utils.pagination import after_cursor, split_page
 
 logger = logging.getLogger(__name__)
 
@@ -44,36 +46,168 @@ class WalletService:
             wallet = await self.create_wallet(user_id)
         return wallet
     
+    def record_transaction(
+        self,
+        wallet: Wallet,
+        kind: WalletTransactionKind,
+        balance_delta: Decimal = Decimal("0"),
+        escrow_delta: Decimal = Decimal("0"),
+        job_id: Optional[UUID] = None,
+        description: Optional[str] = None
+    ) -> WalletTransaction:
+        """
+        Append a ledger entry for a change already applied to ``wallet``.
+        Must be called inside the transaction that changes the balance.
+        """
+        entry = WalletTransaction(
+            user_id=wallet.user_id,
+            kind=kind.value,
+            balance_delta=balance_delta,
+            escrow_delta=escrow_delta,
+            balance_after=wallet.balance,
+            escrow_after=wallet.escrow_balance,
+            job_id=job_id,
+            description=description
+        )
+        self.db.add(entry)
+        return entry
+    
+    async def get_transactions(
+        self,
+        user_id: UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[WalletTransaction], Optional[str]]:
+        """Newest-first page of a user's ledger and the cursor for the next page"""
+        query = select(WalletTransaction).where(WalletTransaction.user_id == user_id)
+        seek = after_cursor(WalletTransaction.created_at, WalletTransaction.id, cursor)
+        if seek is not None:
+            query = query.where(seek)
+        query = query.order_by(
+            WalletTransaction.created_at.desc(), WalletTransaction.id.desc()
+        ).limit(limit + 1)
+        
+        result = await self.db.execute(query)
+        return split_page(result.scalars().all(), limit)
+    
+    async def get_ledger_totals(self, user_id: UUID) -> dict:
+        """Balances derived from the ledger alone, for reconciliation"""
+        result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(WalletTransaction.balance_delta), 0),
+                func.coalesce(func.sum(WalletTransaction.escrow_delta), 0)
+            ).where(WalletTransaction.user_id == user_id)
+        )
+        balance, escrow_balance = result.one()
+        return {"balance": balance, "escrow_balance": escrow_balance}
+    
+    async def lock_wallets(self, user_ids: Sequence[UUID]) -> Dict[UUID, Wallet]:
+        """
+        Lock several wallets with one SELECT ... FOR UPDATE in user_id order.
+        Every multi-wallet operation locking in the same order means two of
+        them can never wait on each other in a cycle.
+        """
+        ordered = sorted(set(user_ids), key=str)
+        result = await self.db.execute(
+            select(Wallet)
+            .where(Wallet.user_id.in_(ordered))
+            .order_by(Wallet.user_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return {wallet.user_id: wallet for wallet in result.scalars().all()}
+    
+    def _guarded_update(self, user_id: UUID, balance_delta: Decimal, escrow_delta: Decimal):
+        """
+        UPDATE applying both deltas, guarded so neither balance goes negative.
+        Matches no row when the wallet is missing or funds are insufficient.
+        """
+        balance = func.coalesce(Wallet.balance, 0)
+        escrow_balance = func.coalesce(Wallet.escrow_balance, 0)
+        statement = update(Wallet).where(Wallet.user_id == user_id)
+        if balance_delta < 0:
+            statement = statement.where(balance >= -balance_delta)
+        if escrow_delta < 0:
+            statement = statement.where(escrow_balance >= -escrow_delta)
+        return statement.values(
+            balance=balance + balance_delta,
+            escrow_balance=escrow_balance + escrow_delta
+        ).returning(Wallet.user_id, Wallet.balance, Wallet.escrow_balance)
+    
+    async def _apply_change(
+        self,
+        change,
+        kind: WalletTransactionKind,
+        balance_delta: Decimal = Decimal("0"),
+        escrow_delta: Decimal = Decimal("0"),
+        job_id: Optional[UUID] = None,
+        description: Optional[str] = None
+    ) -> Optional[Tuple[Decimal, Decimal]]:
+        """
+        Run a wallet UPDATE/upsert ... RETURNING and write its ledger entry in
+        the same statement. Returns (balance, escrow_balance) after the change,
+        or None if the change matched no wallet.
+        """
+        changed = change.cte("changed")
+        entry = insert(WalletTransaction).from_select(
+            [
+                "user_id", "kind", "balance_delta", "escrow_delta",
+                "balance_after", "escrow_after", "job_id", "description"
+            ],
+            select(
+                changed.c.user_id,
+                literal(kind.value, String),
+                literal(balance_delta, Numeric(10, 2)),
+                literal(escrow_delta, Numeric(10, 2)),
+                changed.c.balance,
+                changed.c.escrow_balance,
+                literal(job_id, PG_UUID(as_uuid=True)),
+                literal(description, String)
+            )
+        ).returning(WalletTransaction.balance_after, WalletTransaction.escrow_after)
+        
+        result = await self.db.execute(entry)
+        row = result.first()
+        return tuple(row) if row else None
+    
+    async def _insufficient_funds(self, user_id: UUID, amount: Decimal, escrow: bool = False) -> Exception:
+        """Explain why a guarded update matched nothing (only read on failure)"""
+        wallet = await self.get_wallet_by_user(user_id)
+        if not wallet:
+            return WalletNotFoundError(f"Wallet not found for user {user_id}")
+        if escrow:
+            return InsufficientFundsError(
+                f"Insufficient escrow funds. Available: {wallet.escrow_balance}, Required: {amount}"
+            )
+        return InsufficientFundsError(
+            f"Insufficient funds. Available: {wallet.balance}, Required: {amount}"
+        )
+    
     async def add_funds_atomically(self, user_id: UUID, amount: Decimal, description: Optional[str] = None) -> TransactionResponse:
         """
-        Atomically add funds to user's wallet balance
+        Atomically add funds to user's wallet balance (creating the wallet if needed)
         """
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
         try:
-            # Lock wallet row for update
-            result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == user_id).with_for_update()
+            upsert = pg_insert(Wallet).values(user_id=user_id, balance=amount, escrow_balance=0)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[Wallet.user_id],
+                set_={"balance": func.coalesce(Wallet.balance, 0) + amount}
+            ).returning(Wallet.user_id, Wallet.balance, Wallet.escrow_balance)
+            
+            balance, _ = await self._apply_change(
+                upsert, WalletTransactionKind.DEPOSIT, balance_delta=amount, description=description
             )
-            wallet = result.scalar_one_or_none()
-            
-            if not wallet:
-                wallet = Wallet(user_id=user_id, balance=0, escrow_balance=0)
-                self.db.add(wallet)
-            
-            # Add funds to balance
-            wallet.balance += amount
-            
             await self.db.commit()
-            await self.db.refresh(wallet)
             
-            logger.info(f"Added {amount} to wallet {user_id}. New balance: {wallet.balance}")
+            logger.info(f"Added {amount} to wallet {user_id}. New balance: {balance}")
             
             return TransactionResponse(
                 success=True,
                 message=f"Successfully added {amount} to wallet",
-                new_balance=wallet.balance
+                new_balance=balance
             )
             
         except Exception as e:
@@ -89,34 +223,23 @@ class WalletService:
             raise ValueError("Amount must be positive")
         
         try:
-            # Lock wallet row for update
-            result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == user_id).with_for_update()
+            changed = await self._apply_change(
+                self._guarded_update(user_id, -amount, amount),
+                WalletTransactionKind.ESCROW_HOLD,
+                balance_delta=-amount,
+                escrow_delta=amount
             )
-            wallet = result.scalar_one_or_none()
-            
-            if not wallet:
-                raise WalletNotFoundError(f"Wallet not found for user {user_id}")
-            
-            # Check sufficient funds
-            if wallet.balance < amount:
-                raise InsufficientFundsError(
-                    f"Insufficient funds. Available: {wallet.balance}, Required: {amount}"
-                )
-            
-            # Transfer to escrow
-            wallet.balance -= amount
-            wallet.escrow_balance += amount
-            
+            if changed is None:
+                raise await self._insufficient_funds(user_id, amount)
             await self.db.commit()
-            await self.db.refresh(wallet)
             
-            logger.info(f"Transferred {amount} to escrow for user {user_id}. Balance: {wallet.balance}, Escrow: {wallet.escrow_balance}")
+            balance, escrow_balance = changed
+            logger.info(f"Transferred {amount} to escrow for user {user_id}. Balance: {balance}, Escrow: {escrow_balance}")
             
             return TransactionResponse(
                 success=True,
                 message=f"Successfully transferred {amount} to escrow",
-                new_balance=wallet.balance
+                new_balance=balance
             )
             
         except Exception as e:
@@ -132,34 +255,23 @@ class WalletService:
             raise ValueError("Amount must be positive")
         
         try:
-            # Lock wallet row for update
-            result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == user_id).with_for_update()
+            changed = await self._apply_change(
+                self._guarded_update(user_id, amount, -amount),
+                WalletTransactionKind.ESCROW_RELEASE,
+                balance_delta=amount,
+                escrow_delta=-amount
             )
-            wallet = result.scalar_one_or_none()
-            
-            if not wallet:
-                raise WalletNotFoundError(f"Wallet not found for user {user_id}")
-            
-            # Check sufficient escrow funds
-            if wallet.escrow_balance < amount:
-                raise InsufficientFundsError(
-                    f"Insufficient escrow funds. Available: {wallet.escrow_balance}, Required: {amount}"
-                )
-            
-            # Release from escrow
-            wallet.escrow_balance -= amount
-            wallet.balance += amount
-            
+            if changed is None:
+                raise await self._insufficient_funds(user_id, amount, escrow=True)
             await self.db.commit()
-            await self.db.refresh(wallet)
             
-            logger.info(f"Released {amount} from escrow for user {user_id}. Balance: {wallet.balance}, Escrow: {wallet.escrow_balance}")
+            balance, escrow_balance = changed
+            logger.info(f"Released {amount} from escrow for user {user_id}. Balance: {balance}, Escrow: {escrow_balance}")
             
             return TransactionResponse(
                 success=True,
                 message=f"Successfully released {amount} from escrow",
-                new_balance=wallet.balance
+                new_balance=balance
             )
             
         except Exception as e:
@@ -167,33 +279,36 @@ class WalletService:
             logger.error(f"Failed to release from escrow for wallet {user_id}: {e}")
             raise
     
-    async def transfer_escrow_to_genie_atomically(self, from_user_id: UUID, to_genie_id: UUID, amount: Decimal) -> TransactionResponse:
+    async def transfer_escrow_to_genie_atomically(
+        self,
+        from_user_id: UUID,
+        to_genie_id: UUID,
+        amount: Decimal,
+        job_id: Optional[UUID] = None
+    ) -> TransactionResponse:
         """
-        Atomically transfer funds from user's escrow to genie's balance (for completed jobs)
+        Atomically transfer funds from user's escrow to genie's balance (for completed jobs).
+        Commits; callers that retry on deadlock must retry their whole unit of work.
         """
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
         try:
-            # Lock both wallets for update
-            user_wallet_result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == from_user_id).with_for_update()
+            # Create genie wallet if it doesn't exist, so both rows can be locked
+            await self.db.execute(
+                pg_insert(Wallet)
+                .values(user_id=to_genie_id, balance=0, escrow_balance=0)
+                .on_conflict_do_nothing(index_elements=[Wallet.user_id])
             )
-            user_wallet = user_wallet_result.scalar_one_or_none()
             
-            genie_wallet_result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == to_genie_id).with_for_update()
-            )
-            genie_wallet = genie_wallet_result.scalar_one_or_none()
+            # Lock both wallets for update
+            wallets = await self.lock_wallets([from_user_id, to_genie_id])
+            user_wallet = wallets.get(from_user_id)
+            genie_wallet = wallets[to_genie_id]
             
             if not user_wallet:
                 raise WalletNotFoundError(f"User wallet not found for {from_user_id}")
             
-            if not genie_wallet:
-                # Create genie wallet if it doesn't exist
-                genie_wallet = Wallet(user_id=to_genie_id, balance=0, escrow_balance=0)
-                self.db.add(genie_wallet)
-            
             # Check sufficient escrow funds
             if user_wallet.escrow_balance < amount:
                 raise InsufficientFundsError(
@@ -203,25 +318,21 @@ class WalletService:
             # Transfer funds
             user_wallet.escrow_balance -= amount
             genie_wallet.balance += amount
-            
-            await self.db.commit()
-            await self.db.refresh(user_wallet)
-            await self.db.refresh(genie_wallet)
+            self.record_transaction(
+                user_wallet, WalletTransactionKind.PAYOUT_SENT, escrow_delta=-amount, job_id=job_id
+            )
+            self.record_transaction(
+                genie_wallet, WalletTransactionKind.PAYOUT_RECEIVED, balance_delta=amount, job_id=job_id
+            )
             
             # Notify genie about payment received
-            try:
-                notification_service = NotificationService(self.db)
-                await notification_service.create_notification(
-                    user_id=to_genie_id,
-                    title="Payment received",
-                    message=f"You have received ₹{amount} in your wallet from a completed job."
-                )
-                await self.db.commit()
-            except Exception as notification_error:
-                await self.db.rollback()
-                logger.warning(
-                    f"Wallet transfer completed but notification failed for genie {to_genie_id}: {notification_error}"
-                )
+            NotificationService(self.db).enqueue_notification(
+                user_id=to_genie_id,
+                title="Payment received",
+                message=f"You have received ₹{amount} in your wallet from a completed job."
+            )
+            
+            await self.db.commit()
             
             logger.info(f"Transferred {amount} from user {from_user_id} escrow to genie {to_genie_id} balance")
             
@@ -236,7 +347,7 @@ class WalletService:
             logger.error(f"Failed to transfer escrow to genie: {e}")
             raise
     
-    async def withdraw_funds_atomically(self, user_id: UUID, amount: Decimal) -> TransactionResponse:
+    async def withdraw_funds_atomically(self, user_id: UUID, amount: Decimal, description: Optional[str] = None) -> TransactionResponse:
         """
         Atomically withdraw funds from user's wallet balance
         """
@@ -244,33 +355,23 @@ class WalletService:
             raise ValueError("Amount must be positive")
         
         try:
-            # Lock wallet row for update
-            result = await self.db.execute(
-                select(Wallet).where(Wallet.user_id == user_id).with_for_update()
+            changed = await self._apply_change(
+                self._guarded_update(user_id, -amount, Decimal("0")),
+                WalletTransactionKind.WITHDRAWAL,
+                balance_delta=-amount,
+                description=description
             )
-            wallet = result.scalar_one_or_none()
-            
-            if not wallet:
-                raise WalletNotFoundError(f"Wallet not found for user {user_id}")
-            
-            # Check sufficient funds
-            if wallet.balance < amount:
-                raise InsufficientFundsError(
-                    f"Insufficient funds. Available: {wallet.balance}, Required: {amount}"
-                )
-            
-            # Withdraw funds
-            wallet.balance -= amount
-            
+            if changed is None:
+                raise await self._insufficient_funds(user_id, amount)
             await self.db.commit()
-            await self.db.refresh(wallet)
             
-            logger.info(f"Withdrew {amount} from wallet {user_id}. New balance: {wallet.balance}")
+            balance, _ = changed
+            logger.info(f"Withdrew {amount} from wallet {user_id}. New balance: {balance}")
             
             return TransactionResponse(
                 success=True,
                 message=f"Successfully withdrew {amount}",
-                new_balance=wallet.balance
+                new_balance=balance
             )
             
         except Exception as e:
@@ -0,0 +1,88 @@
+from fastapi import WebSocket
+from typing import Callable, Optional
+from uuid import UUID
+import asyncio
+import json
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PING_FRAME = json.dumps({"type": "ping"})
+
+
+class ClientConnection:
+    """
+    Outbound side of one socket: a bounded queue of pre-serialized frames
+    drained by a dedicated writer task, so a slow client only delays itself.
+
+    A heartbeat task queues a ping every CHAT_PING_INTERVAL_SECONDS whatever
+    other traffic is flowing. The socket is idle once nothing (not even a
+    pong) has come back for CHAT_IDLE_TIMEOUT_SECONDS; the owner marks
+    inbound frames with ``touch()``.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        room,
+        user_id: UUID,
+        on_failure: Callable[["ClientConnection"], None],
+        on_idle: Optional[Callable[["ClientConnection"], None]] = None
+    ):
+        self.websocket = websocket
+        self.room = room  # Key the owning manager files this socket under
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self._on_failure = on_failure
+        self._on_idle = on_idle or on_failure
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    def stop(self):
+        for task in (self._task, self._heartbeat_task):
+            if task is not None and not task.done() and task is not asyncio.current_task():
+                task.cancel()
+    
+    def touch(self):
+        """Record an inbound frame from the client"""
+        self.last_seen = time.monotonic()
+    
+    def enqueue(self, text: str) -> bool:
+        """Queue a frame; False means the client has fallen too far behind"""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+    
+    async def _writer(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(
+                    self.websocket.send_text(text),
+                    timeout=settings.CHAT_SEND_TIMEOUT_SECONDS
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket send failed for {self.room}, dropping socket: {e!r}")
+            self._on_failure(self)
+    
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.CHAT_PING_INTERVAL_SECONDS)
+            if time.monotonic() - self.last_seen > settings.CHAT_IDLE_TIMEOUT_SECONDS:
+                # Pings went unanswered
+                self._on_idle(self)
+                return
+            # A full queue is left to the manager's slow-consumer eviction
+            self.enqueue(PING_FRAME)
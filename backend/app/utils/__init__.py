@@ -22,6 +22,7 @@ from app.utils.exceptions import (
     DatabaseError,
     ExternalServiceError
 )
+from app.utils.cache import LRUCache
 
 __all__ = [
     "BaseAPIException",
@@ -45,5 +46,6 @@ __all__ = [
     "ComplaintNotFoundError",
     "ComplaintAlreadyResolvedError",
     "DatabaseError",
-    "ExternalServiceError"
+    "ExternalServiceError",
+    "LRUCache"
 ]
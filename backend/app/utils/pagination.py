@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+import base64
+import json
+
+from fastapi import Response
+from sqlalchemy import tuple_
+
+from app.utils.exceptions import ValidationError
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Encode a (created_at, id) position as an opaque URL-safe cursor"""
+    raw = json.dumps([created_at.isoformat(), str(row_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except Exception:
+        raise ValidationError("Invalid pagination cursor")
+
+
+def after_cursor(created_at_column, id_column, cursor: Optional[str]):
+    """
+    WHERE clause selecting rows strictly after ``cursor`` for an ordering of
+    ``created_at DESC, id DESC``. Returns None when no cursor is given.
+    """
+    if not cursor:
+        return None
+    created_at, row_id = decode_cursor(cursor)
+    # Row comparison lets Postgres seek straight into the composite index
+    return tuple_(created_at_column, id_column) < tuple_(created_at, row_id)
+
+
+def split_page(rows: Sequence[Any], limit: int, key=lambda row: (row.created_at, row.id)) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a result fetched with ``limit + 1`` rows to ``limit`` and return the
+    cursor for the next page (None on the last page).
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    created_at, row_id = key(page[-1])
+    return page, encode_cursor(created_at, row_id)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page cursor without changing list response bodies"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
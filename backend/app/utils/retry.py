@@ -0,0 +1,55 @@
+from functools import wraps
+from typing import Optional
+import asyncio
+import logging
+import random
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERIALIZATION_FAILURE = "40001"
+DEADLOCK_DETECTED = "40P01"
+RETRYABLE_SQLSTATES = {SERIALIZATION_FAILURE, DEADLOCK_DETECTED}
+
+
+def sqlstate_of(exc: BaseException) -> Optional[str]:
+    """SQLSTATE of a database error, looking through SQLAlchemy/asyncpg wrappers"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        for candidate in (exc, getattr(exc, "orig", None)):
+            code = getattr(candidate, "sqlstate", None) or getattr(candidate, "pgcode", None)
+            if isinstance(code, str):
+                return code
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def retry_on_conflict(attempts: Optional[int] = None, base_delay: Optional[float] = None):
+    """
+    Re-run an async unit of work when Postgres aborts it with a deadlock or
+    serialization failure, sleeping with full jitter between attempts.
+
+    Only decorate methods that own their whole transaction (roll back on
+    error, commit on success); a nested call must not retry on its own.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            max_attempts = attempts or settings.DB_RETRY_ATTEMPTS
+            delay = base_delay if base_delay is not None else settings.DB_RETRY_BASE_DELAY_MS / 1000
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    if attempt >= max_attempts or sqlstate_of(e) not in RETRYABLE_SQLSTATES:
+                        raise
+                    sleep_for = random.uniform(0, delay * 2 ** (attempt - 1))
+                    logger.warning(
+                        f"{func.__qualname__} hit {sqlstate_of(e)}, retrying "
+                        f"({attempt}/{max_attempts - 1}) in {sleep_for * 1000:.0f}ms"
+                    )
+                    await asyncio.sleep(sleep_for)
+        return wrapper
+    return decorator
@@ -13,8 +13,13 @@ export default function JobChat({
   const [newMessage, setNewMessage] = useState("");
   const [isConnected, setIsConnected] = useState(false);
   const [isChatOpen, setIsChatOpen] = useState(false);
+  // Older pages exist on the server beyond the first message we hold
+  const [hasOlder, setHasOlder] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const wsRef = useRef(null);
   const messagesEndRef = useRef(null);
+  // Last message we have, so a reconnect only fetches what was missed
+  const lastMessageIdRef = useRef(null);
 
   const canChat = ["POSTED", "ACCEPTED", "IN_PROGRESS"].includes(jobStatus);
 
@@ -34,9 +39,17 @@ export default function JobChat({
   };
 
   useEffect(() => {
-    scrollToBottom();
+    const lastId = messages.length ? messages[messages.length - 1].id : null;
+    // Only follow new messages; prepending an older page keeps the position
+    if (lastId !== lastMessageIdRef.current) scrollToBottom();
+    lastMessageIdRef.current = lastId;
   }, [messages]);
 
+  useEffect(() => {
+    lastMessageIdRef.current = null;
+    setHasOlder(false);
+  }, [jobId]);
+
   useEffect(() => {
     // In floating mode, connect immediately. In inline mode, only connect if chat is open
     const shouldConnect = isFloating ? canChat : canChat && isChatOpen;
@@ -63,7 +76,10 @@ export default function JobChat({
     }
 
     // Create WebSocket connection
-    const wsUrl = `ws://localhost:8000/api/v1/chat/ws/${jobId}?token=${token}`;
+    const sinceParam = lastMessageIdRef.current
+      ? `&since=${lastMessageIdRef.current}`
+      : "";
+    const wsUrl = `ws://localhost:8000/api/v1/chat/ws/${jobId}?token=${token}${sinceParam}`;
     console.log("Attempting WebSocket connection to:", wsUrl);
     const ws = new WebSocket(wsUrl);
 
@@ -76,12 +92,42 @@ export default function JobChat({
       const data = JSON.parse(event.data);
       console.log("WebSocket message received:", data);
 
+      if (data.type === "ping") {
+        // Server heartbeat; answering keeps the connection from idling out
+        ws.send(JSON.stringify({ type: "pong" }));
+        return;
+      }
+
       if (data.type === "history") {
         // Replace entire history, deduplicating by message ID
         const uniqueMessages = Array.from(
           new Map(data.messages.map((msg) => [msg.id, msg])).values(),
         );
         setMessages(uniqueMessages);
+        setHasOlder(data.has_more);
+      } else if (data.type === "sync") {
+        // Reconnect delta: append only messages we don't have yet
+        setMessages((prev) => {
+          const known = new Set(prev.map((m) => m.id));
+          return [...prev, ...data.messages.filter((m) => !known.has(m.id))];
+        });
+        if (data.has_more && data.messages.length) {
+          // More was missed than fits in one page; keep catching up
+          ws.send(
+            JSON.stringify({
+              type: "sync",
+              after: data.messages[data.messages.length - 1].id,
+            }),
+          );
+        }
+      } else if (data.type === "history_page") {
+        // Older page requested with "Load older messages"
+        setMessages((prev) => {
+          const known = new Set(prev.map((m) => m.id));
+          return [...data.messages.filter((m) => !known.has(m.id)), ...prev];
+        });
+        setHasOlder(data.has_more);
+        setLoadingOlder(false);
       } else if (data.type === "new_message") {
         // Only add message if it doesn't already exist (prevents duplicates)
         setMessages((prev) => {
@@ -109,6 +155,7 @@ export default function JobChat({
         event.reason,
       );
       setIsConnected(false);
+      setLoadingOlder(false);
       // Clear the ref when connection closes
       if (wsRef.current === ws) {
         wsRef.current = null;
@@ -126,6 +173,25 @@ export default function JobChat({
     };
   }, [jobId, canChat, isChatOpen, isFloating]);
 
+  const loadOlder = () => {
+    if (!isConnected || loadingOlder || !messages.length) return;
+    setLoadingOlder(true);
+    wsRef.current?.send(
+      JSON.stringify({ type: "load_history", before: messages[0].id }),
+    );
+  };
+
+  const loadOlderButton = hasOlder && (
+    <button
+      type="button"
+      className="btn btn--ghost btn--sm job-chat__load-older"
+      onClick={loadOlder}
+      disabled={!isConnected || loadingOlder}
+    >
+      {loadingOlder ? "Loading..." : "Load older messages"}
+    </button>
+  );
+
   const sendMessage = (e) => {
     e.preventDefault();
 
@@ -150,6 +216,7 @@ export default function JobChat({
     return (
       <div className="job-chat__floating-content">
         <div className="job-chat__messages">
+          {loadOlderButton}
           {messages.length === 0 ? (
             <div className="job-chat__empty">
               <p>
@@ -256,6 +323,7 @@ export default function JobChat({
           </div>
 
           <div className="job-chat__messages">
+            {loadOlderButton}
             {messages.length === 0 ? (
               <div className="job-chat__empty">
                 <p>
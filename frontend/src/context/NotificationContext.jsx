@@ -1,10 +1,18 @@
-import { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 import { api } from '../services/api';
 import { AuthContext } from './AuthContext';
 
 const NotificationContext = createContext(null);
 
 const STORAGE_KEY = 'genie_notifications_read';
+const POLL_INTERVAL_MS = 30000;
+const MAX_RECONNECT_DELAY_MS = 30000;
+const LIST_LIMIT = 20;
+
+function notificationStreamUrl(token) {
+    const base = (import.meta.env.VITE_BACKEND_URL || '').replace(/^http/, 'ws');
+    return `${base}/api/v1/notifications/ws?token=${encodeURIComponent(token)}`;
+}
 
 export function NotificationProvider({ children }) {
     // Read token directly from AuthContext so we only poll when authenticated
@@ -39,7 +47,7 @@ export function NotificationProvider({ children }) {
     const fetchNotifications = useCallback(async () => {
         setLoading(true);
         try {
-            const data = await api.get('/api/v1/notifications/?limit=20&include_read=true');
+            const data = await api.get(`/api/v1/notifications/?limit=${LIST_LIMIT}&include_read=true`);
             const readIds = getReadStatusFromStorage();
             
             // Mark notifications as read based on localStorage
@@ -115,7 +123,43 @@ export function NotificationProvider({ children }) {
         setIsOpen(false);
     }, []);
 
-    // Poll for new notifications every 30 seconds — only while authenticated
+    // Mirror of the list so stream handlers can diff against current state
+    const notificationsRef = useRef(notifications);
+    useEffect(() => {
+        notificationsRef.current = notifications;
+    }, [notifications]);
+
+    // Handle a frame pushed over the notification stream
+    const handleStreamEvent = useCallback((data) => {
+        if (data.type === 'unread_count') {
+            // Sent on connect; the server count also covers items beyond the list
+            setUnreadCount(data.unread_count);
+        } else if (data.type === 'notification') {
+            if (notificationsRef.current.some(n => n.id === data.notification.id)) return;
+            setNotifications(prev => [data.notification, ...prev].slice(0, LIST_LIMIT));
+            setUnreadCount(prev => prev + 1);
+        } else if (data.type === 'read') {
+            // Marked read in another tab (our own reads are already applied)
+            const ids = new Set(data.ids);
+            const newlyRead = notificationsRef.current.filter(n => ids.has(n.id) && !n.is_read).length;
+            if (!newlyRead) return;
+            setNotifications(prev => prev.map(n => (ids.has(n.id) ? { ...n, is_read: true } : n)));
+            setUnreadCount(prev => Math.max(0, prev - newlyRead));
+        } else if (data.type === 'read_all') {
+            setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+            setUnreadCount(0);
+        } else if (data.type === 'deleted') {
+            // Unread ones are kept on the server unless include_unread was set
+            const cutoff = new Date(data.before);
+            const removed = n => new Date(n.created_at) < cutoff && (data.include_unread || n.is_read);
+            setNotifications(prev => prev.filter(n => !removed(n)));
+            setUnreadCount(prev => Math.max(0, prev - (data.unread_removed || 0)));
+        }
+    }, []);
+
+    // Live updates over a WebSocket; poll every 30 seconds only while the
+    // stream is down. Active only while authenticated.
+    const wsRef = useRef(null);
     useEffect(() => {
         if (!token) {
             // User is logged out — wipe any stale notification state
@@ -124,11 +168,63 @@ export function NotificationProvider({ children }) {
             return;
         }
 
+        let closed = false;
+        let pollTimer = null;
+        let reconnectTimer = null;
+        let reconnectDelay = 1000;
+        let hasConnected = false;
+
+        const startPolling = () => {
+            if (!pollTimer) pollTimer = setInterval(fetchNotifications, POLL_INTERVAL_MS);
+        };
+        const stopPolling = () => {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        };
+
+        const connect = () => {
+            const ws = new WebSocket(notificationStreamUrl(token));
+            wsRef.current = ws;
+
+            ws.onopen = () => {
+                reconnectDelay = 1000;
+                stopPolling();
+                // Catch up on anything missed while disconnected
+                if (hasConnected) fetchNotifications();
+                hasConnected = true;
+            };
+
+            ws.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.type === 'ping') {
+                    ws.send(JSON.stringify({ type: 'pong' }));
+                    return;
+                }
+                handleStreamEvent(data);
+            };
+
+            ws.onclose = () => {
+                if (wsRef.current === ws) wsRef.current = null;
+                if (closed) return;
+                startPolling();
+                reconnectTimer = setTimeout(connect, reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, MAX_RECONNECT_DELAY_MS);
+            };
+        };
+
         fetchNotifications();
+        connect();
 
-        const interval = setInterval(fetchNotifications, 30000);
-        return () => clearInterval(interval);
-    }, [token, fetchNotifications]);
+        return () => {
+            closed = true;
+            stopPolling();
+            clearTimeout(reconnectTimer);
+            if (wsRef.current) {
+                wsRef.current.close();
+                wsRef.current = null;
+            }
+        };
+    }, [token, fetchNotifications, handleStreamEvent]);
 
     // Close dropdown when clicking outside
     useEffect(() => {
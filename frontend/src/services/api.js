@@ -8,10 +8,16 @@ function clearSession() {
   localStorage.removeItem("access_token");
 }
 
+// After a write the backend sends X-Recent-Write (seconds); echoing it back
+// until then keeps our reads on the primary, whichever worker serves them
+const RECENT_WRITE_HEADER = "X-Recent-Write";
+let recentWriteUntil = 0;
+
 /**
  * Centralised fetch wrapper.
  *
  * - Automatically attaches Bearer token
+ * - Echoes X-Recent-Write after our own writes (read-your-writes)
  * - Parses JSON (falls back gracefully for non-JSON responses)
  * - On 401: clears session and dispatches a custom event so AuthContext can react
  * - Throws clean Error objects with a `status` property
@@ -25,6 +31,7 @@ export async function apiRequest(endpoint, options = {}) {
 
   const headers = {
     ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    ...(Date.now() < recentWriteUntil ? { [RECENT_WRITE_HEADER]: "1" } : {}),
     ...options.headers,
   };
 
@@ -37,6 +44,11 @@ export async function apiRequest(endpoint, options = {}) {
     headers,
   });
 
+  const recentWrite = Number(response.headers.get(RECENT_WRITE_HEADER));
+  if (recentWrite > 0) {
+    recentWriteUntil = Math.max(recentWriteUntil, Date.now() + recentWrite * 1000);
+  }
+
   // Parse body — handle empty 204 No Content
   let data = null;
   const contentType = response.headers.get("content-type") || "";